@@ -0,0 +1,272 @@
+"""
+Headless batch inspection of saved product images.
+
+Runs the comparison pipeline of the application on a directory or glob of
+product images against one saved reference, without Tk. Images are spread
+over a process pool in chunks and results are written as they finish:
+
+    python -m src.batch_inspection coffe "data/2024-05-02/*.png" -o results.csv
+    python -m src.batch_inspection coffe data/2024-05-02 -o results.jsonl -w 8
+
+CSV output has one row per area; JSONL output has one record per image.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Optional
+
+import cv2 as cv
+from PIL import Image
+
+from src.config import paths
+from src.utilities.comparison_engine import (ComparisonEngine,
+                                             default_worker_count)
+from src.utilities.file_helper import read_last_reference_image_coordinates
+from src.utilities.frame_alignment import FrameAligner
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+CSV_FIELDS = [
+    "path",
+    "reference",
+    "passed",
+    "roi",
+    "roi_passed",
+    "scores",
+    "cascade_stage",
+    "roi_elapsed_ms",
+    "elapsed_ms",
+    "dx",
+    "dy",
+    "error",
+]
+
+# Her işçi sürecinde bir kez yüklenir
+_worker = {}
+
+
+def _init_worker(
+    reference_image_name: str, align_frames: bool, diff_dir: Optional[str]
+):
+    # Süreç havuzu zaten tüm çekirdekleri kullanır; OpenCV iş parçacıkları kapatılır
+    cv.setNumThreads(1)
+    reference_image_path = paths.SRC_REFERENCE_IMAGES_DIR.joinpath(
+        f"{reference_image_name}.png"
+    )
+    _worker.update(
+        reference_image_name=reference_image_name,
+        reference_image=Image.open(reference_image_path).convert("RGB"),
+        coordinates=read_last_reference_image_coordinates(reference_image_name),
+        engine=ComparisonEngine(
+            max_workers=1, aligner=FrameAligner() if align_frames else None
+        ),
+        diff_dir=Path(diff_dir) if diff_dir else None,
+    )
+
+
+def _inspect_image(image_path: str) -> dict:
+    start = time.perf_counter()
+    record = {"path": image_path, "reference": _worker["reference_image_name"]}
+    try:
+        product_image = Image.open(image_path).convert("RGB")
+        result = _worker["engine"].compare(
+            _worker["reference_image_name"],
+            _worker["reference_image"],
+            product_image,
+            _worker["coordinates"],
+        )
+    except Exception as err:
+        record.update(passed=None, error=f"{type(err).__name__}: {err}", rois=[])
+        record["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        return record
+
+    rois = []
+    for roi_result in result.roi_results:
+        if roi_result.diff_image is not None and _worker["diff_dir"] is not None:
+            Image.fromarray(roi_result.diff_image).save(
+                _worker["diff_dir"].joinpath(
+                    f"{Path(image_path).stem}_roi{roi_result.index}.png"
+                )
+            )
+        rois.append(
+            {
+                "roi": roi_result.index,
+                "passed": roi_result.passed,
+                "scores": roi_result.scores,
+                "cascade_stage": roi_result.cascade_stage,
+                "elapsed_ms": roi_result.elapsed * 1000,
+            }
+        )
+    record.update(
+        passed=result.passed,
+        rois=rois,
+        dx=result.alignment.dx,
+        dy=result.alignment.dy,
+        elapsed_ms=(time.perf_counter() - start) * 1000,
+    )
+    return record
+
+
+def _inspect_chunk(image_paths: list[str]) -> list[dict]:
+    return [_inspect_image(image_path) for image_path in image_paths]
+
+
+def collect_image_paths(inputs: Iterable[str]) -> list[str]:
+    """Image files of the given directories, glob patterns and file paths."""
+    image_paths = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = sorted(path.iterdir())
+        elif path.exists():
+            candidates = [path]
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(item, recursive=True))
+        image_paths.extend(
+            str(candidate)
+            for candidate in candidates
+            if candidate.is_file() and candidate.suffix.lower() in IMAGE_SUFFIXES
+        )
+    return image_paths
+
+
+class ResultWriter:
+    """Streams inspection records to a CSV (one row per area) or JSONL file."""
+
+    def __init__(self, output, output_format: str):
+        self.output = output
+        self.output_format = output_format
+        self._csv_writer = None
+        if output_format == "csv":
+            self._csv_writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+            self._csv_writer.writeheader()
+
+    def write(self, record: dict):
+        if self._csv_writer is None:
+            self.output.write(json.dumps(record, default=float) + "\n")
+        else:
+            common = {
+                "path": record["path"],
+                "reference": record["reference"],
+                "passed": record["passed"],
+                "elapsed_ms": f"{record['elapsed_ms']:.2f}",
+                "dx": record.get("dx", ""),
+                "dy": record.get("dy", ""),
+                "error": record.get("error", ""),
+            }
+            if not record["rois"]:
+                self._csv_writer.writerow(common)
+            for roi in record["rois"]:
+                self._csv_writer.writerow(
+                    dict(
+                        common,
+                        roi=roi["roi"],
+                        roi_passed=roi["passed"],
+                        scores=json.dumps(roi["scores"], default=float),
+                        cascade_stage=roi["cascade_stage"] or "",
+                        roi_elapsed_ms=f"{roi['elapsed_ms']:.2f}",
+                    )
+                )
+        self.output.flush()
+
+
+def run_batch(
+    reference_image_name: str,
+    image_paths: list[str],
+    writer: ResultWriter,
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    align_frames: bool = True,
+    diff_dir: Optional[str] = None,
+) -> dict:
+    """
+    Inspect image_paths on a process pool and write every record as soon as
+    its chunk finishes. Returns the pass/fail/error counts and the throughput.
+    """
+    start = time.perf_counter()
+    summary = {"images": 0, "passed": 0, "failed": 0, "errors": 0}
+    chunks = [
+        image_paths[i : i + chunk_size] for i in range(0, len(image_paths), chunk_size)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers or default_worker_count(),
+        initializer=_init_worker,
+        initargs=(reference_image_name, align_frames, diff_dir),
+    ) as executor:
+        futures = [executor.submit(_inspect_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for record in future.result():
+                writer.write(record)
+                summary["images"] += 1
+                if record["passed"] is None:
+                    summary["errors"] += 1
+                elif record["passed"]:
+                    summary["passed"] += 1
+                else:
+                    summary["failed"] += 1
+    summary["elapsed_s"] = time.perf_counter() - start
+    summary["images_per_s"] = (
+        summary["images"] / summary["elapsed_s"] if summary["elapsed_s"] else 0.0
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect saved product images against a saved reference."
+    )
+    parser.add_argument("reference", help="Saved reference image name")
+    parser.add_argument(
+        "inputs", nargs="+", help="Product image files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "-o", "--output", help="Output file (.csv or .jsonl); stdout when omitted"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=("csv", "jsonl"), help="Output format override"
+    )
+    parser.add_argument("-w", "--workers", type=int, help="Worker process count")
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument(
+        "--no-align", action="store_true", help="Do not align frames to the reference"
+    )
+    parser.add_argument("--diff-dir", help="Directory for the failed area images")
+    args = parser.parse_args()
+
+    image_paths = collect_image_paths(args.inputs)
+    if not image_paths:
+        parser.error("no product images found")
+    output_format = args.format or (
+        "jsonl" if args.output and args.output.endswith(".jsonl") else "csv"
+    )
+    if args.diff_dir:
+        Path(args.diff_dir).mkdir(parents=True, exist_ok=True)
+
+    output = (
+        open(args.output, "w", encoding="utf-8", newline="")
+        if args.output
+        else sys.stdout
+    )
+    try:
+        summary = run_batch(
+            args.reference,
+            image_paths,
+            ResultWriter(output, output_format),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            align_frames=not args.no_align,
+            diff_dir=args.diff_dir,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Benchmark suite of the inspection pipeline stages.
+
+Times every stage of an inspection (PIL/numpy conversions, gray conversion,
+smoothing, Canny, SSIM, histogram, difference overlay, the per-area pipeline,
+camera frame post-processing and PhotoImage creation) on synthetic labels at
+several area sizes and counts, and optionally on saved references and
+recorded product images. Results are written as JSON; given a baseline file
+the run is compared against it and exits with status 1 on a regression:
+
+    python -m src.benchmark -o benchmark.json
+    python -m src.benchmark --reference coffe --samples "data/*.png" \\
+        --baseline benchmark.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+from src.batch_inspection import collect_image_paths
+from src.config import paths
+from src.utilities.comparison_engine import ComparisonEngine
+from src.utilities.edge_preserving import SMOOTHING_MODES, smooth
+from src.utilities.fast_ssim import (SSIM_BACKEND_FAST, SSIM_BACKEND_SKIMAGE,
+                                     compute_ssim_moments,
+                                     structural_similarity_score)
+from src.utilities.file_helper import read_last_reference_image_coordinates
+from src.utilities.frame_alignment import FrameAligner
+from src.utilities.image_comparison import (
+    filter_product_image, find_the_difference_between_two_images,
+    histogram_intersection)
+from src.utilities.metric_registry import DEFAULT_DECISION_RULE, MetricContext
+from src.utilities.reference_cache import (build_reference_features,
+                                           grayscale_histogram, to_gray)
+from src.utilities.synthetic_labels import perturb, synthetic_frame
+
+DEFAULT_ROI_SIZES = ((64, 64), (128, 128), (256, 192), (400, 300))
+DEFAULT_ROI_COUNTS = (1, 4, 8)
+DEFAULT_PARAMS = (25, 75.0, 75.0, 50, 150)
+CAMERA_FRAME_SIZE = (1920, 1080)
+CANVAS_SIZE = (800, 600)
+
+
+def measure(func: Callable[[], object], repeat: int, warmup: int = 1) -> dict:
+    """Wall time statistics of func in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "min_ms": samples[0],
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "repeat": repeat,
+    }
+
+
+def _size_key(width: int, height: int) -> str:
+    return f"{width}x{height}"
+
+
+def benchmark_roi_stages(
+    reference: np.ndarray, product: np.ndarray, params: tuple, repeat: int
+) -> dict:
+    """Per-area stages on one reference/product crop pair (RGB arrays)."""
+    product_pil = Image.fromarray(product)
+    reference_gray = to_gray(reference)
+    product_gray = to_gray(product)
+    reference_features = build_reference_features(reference, params)
+    filtered_product, product_edges = filter_product_image(product_gray, params)
+    reference_moments = compute_ssim_moments(reference_features.filtered)
+    reference_histogram = grayscale_histogram(reference_features.filtered)
+
+    stages = {
+        "pil_to_numpy": lambda: np.asarray(product_pil),
+        "numpy_to_pil": lambda: Image.fromarray(product),
+        "gray_conversion": lambda: to_gray(product_pil),
+        "canny": lambda: cv.Canny(filtered_product, params[3], params[4]),
+        "ssim_skimage": lambda: structural_similarity_score(
+            reference_features.filtered, filtered_product, SSIM_BACKEND_SKIMAGE
+        ),
+        "ssim_fast": lambda: structural_similarity_score(
+            reference_features.filtered,
+            filtered_product,
+            SSIM_BACKEND_FAST,
+            reference_moments=reference_moments,
+            downscale=1.0,
+        ),
+        "histogram": lambda: histogram_intersection(
+            reference_histogram, grayscale_histogram(filtered_product)
+        ),
+        "diff_overlay": lambda: find_the_difference_between_two_images(
+            product_pil, reference_features.edges, product_edges
+        ),
+        "reference_features": lambda: build_reference_features(reference, params),
+        "roi_pipeline": lambda: _roi_pipeline(reference_features, product, params),
+    }
+    for mode in SMOOTHING_MODES:
+        stages[f"smooth_{mode}"] = lambda mode=mode: smooth(
+            reference_gray, params, mode
+        )
+    return {name: measure(func, repeat) for name, func in stages.items()}
+
+
+def _roi_pipeline(reference_features, product_image, params: tuple) -> bool:
+    """evaluate_similarity without the on-disk parameter lookup."""
+    product_gray = to_gray(product_image)
+    filtered_product, product_edges = filter_product_image(product_gray, params)
+    passed, _ = DEFAULT_DECISION_RULE.evaluate(
+        MetricContext(
+            reference=reference_features,
+            product_gray=product_gray,
+            filtered_product=filtered_product,
+            product_edges=product_edges,
+            options={"ssim_backend": SSIM_BACKEND_FAST},
+        )
+    )
+    if not passed:
+        find_the_difference_between_two_images(
+            product_image, reference_features.edges, product_edges
+        )
+    return passed
+
+
+def benchmark_synthetic(
+    roi_sizes=DEFAULT_ROI_SIZES,
+    roi_counts=DEFAULT_ROI_COUNTS,
+    params: tuple = DEFAULT_PARAMS,
+    repeat: int = 10,
+) -> dict:
+    """Area stages per area size, and whole-frame pipelines per area count."""
+    results = {}
+    for width, height in roi_sizes:
+        reference_frame, rois = synthetic_frame((width, height), 1)
+        x1, y1, x2, y2 = rois[0]
+        reference = reference_frame[y1:y2, x1:x2]
+        product = perturb(reference, seed=1)
+        for stage, stats in benchmark_roi_stages(
+            reference, product, params, repeat
+        ).items():
+            results[f"{stage}[{_size_key(width, height)}]"] = stats
+
+        for count in roi_counts:
+            try:
+                reference_frame, rois = synthetic_frame((width, height), count)
+            except ValueError:
+                continue
+            product_frame = Image.fromarray(perturb(reference_frame, seed=2))
+            reference_frame = Image.fromarray(reference_frame)
+            features = [
+                build_reference_features(reference_frame.crop(roi), params)
+                for roi in rois
+            ]
+
+            def frame_pipeline():
+                for roi, reference_features in zip(rois, features):
+                    _roi_pipeline(reference_features, product_frame.crop(roi), params)
+
+            results[f"frame_pipeline[{count}x{_size_key(width, height)}]"] = measure(
+                frame_pipeline, max(3, repeat // count)
+            )
+    return results
+
+
+def benchmark_frames(repeat: int = 10) -> dict:
+    """Camera frame post-processing of VideoStreamHandler and canvas display."""
+    frame_width, frame_height = CAMERA_FRAME_SIZE
+    canvas_width, canvas_height = CANVAS_SIZE
+    frame = np.random.default_rng(0).integers(
+        0, 255, (frame_height, frame_width, 3), dtype=np.uint8
+    )
+    start_row = (frame_height - canvas_height) // 2
+    start_col = (frame_width - canvas_width) // 2
+
+    def crop_to_pil():
+        return Image.fromarray(
+            frame[
+                start_row : start_row + canvas_height,
+                start_col : start_col + canvas_width,
+            ]
+        )
+
+    key = _size_key(canvas_width, canvas_height)
+    results = {f"frame_crop_to_pil[{key}]": measure(crop_to_pil, repeat)}
+
+    aligner = FrameAligner()
+    reference_frame = crop_to_pil()
+    product_frame = Image.fromarray(np.roll(np.asarray(reference_frame), 3, axis=1))
+    results[f"frame_alignment[{key}]"] = measure(
+        lambda: aligner.estimate("benchmark", reference_frame, product_frame), repeat
+    )
+
+    photo_image = _photo_image_benchmark(reference_frame, repeat)
+    if photo_image is not None:
+        results[f"photoimage[{key}]"] = photo_image
+    return results
+
+
+def _photo_image_benchmark(image: Image.Image, repeat: int) -> Optional[dict]:
+    """PhotoImage creation needs a Tk root; skipped on a headless machine."""
+    import tkinter as tk
+
+    from PIL import ImageTk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    try:
+        return measure(lambda: ImageTk.PhotoImage(image), repeat)
+    finally:
+        root.destroy()
+
+
+def benchmark_samples(
+    reference_image_name: str, sample_paths: list[str], repeat: int = 3
+) -> dict:
+    """Whole inspections of recorded product images against a saved reference."""
+    reference_image = Image.open(
+        paths.SRC_REFERENCE_IMAGES_DIR.joinpath(f"{reference_image_name}.png")
+    ).convert("RGB")
+    coordinates = read_last_reference_image_coordinates(reference_image_name)
+    products = [Image.open(path).convert("RGB") for path in sample_paths] or [
+        reference_image
+    ]
+    engine = ComparisonEngine(aligner=FrameAligner())
+
+    def inspect_samples():
+        for product_image in products:
+            engine.compare(
+                reference_image_name, reference_image, product_image, coordinates
+            )
+
+    try:
+        stats = measure(inspect_samples, repeat)
+    finally:
+        engine.shutdown()
+    for key in ("median_ms", "mean_ms", "min_ms", "p95_ms"):
+        stats[key] /= len(products)
+    stats["images"] = len(products)
+    return {f"inspection[{reference_image_name}]": stats}
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "opencv": cv.__version__,
+        "opencv_threads": cv.getNumThreads(),
+    }
+
+
+def compare_with_baseline(
+    results: dict, baseline: dict, tolerance: float = 0.2
+) -> list[dict]:
+    """
+    Median ratio of every benchmark present in both runs. A ratio above
+    1 + tolerance is a regression.
+    """
+    comparison = []
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous.get("median_ms"):
+            continue
+        ratio = stats["median_ms"] / previous["median_ms"]
+        comparison.append(
+            {
+                "name": name,
+                "baseline_ms": previous["median_ms"],
+                "median_ms": stats["median_ms"],
+                "ratio": ratio,
+                "regression": ratio > 1 + tolerance,
+            }
+        )
+    return comparison
+
+
+def _parse_size(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the inspection pipeline stages."
+    )
+    parser.add_argument(
+        "--roi-sizes",
+        nargs="+",
+        type=_parse_size,
+        default=DEFAULT_ROI_SIZES,
+        help="Area sizes as WIDTHxHEIGHT",
+    )
+    parser.add_argument("--roi-counts", nargs="+", type=int, default=DEFAULT_ROI_COUNTS)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--reference", help="Saved reference for recorded samples")
+    parser.add_argument(
+        "--samples", nargs="*", default=[], help="Recorded product images or globs"
+    )
+    parser.add_argument("-o", "--output", help="Result JSON file; stdout when omitted")
+    parser.add_argument("--baseline", help="Result JSON of a previous run")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed median slowdown against the baseline (0.2 = 20%%)",
+    )
+    args = parser.parse_args()
+
+    results = benchmark_synthetic(args.roi_sizes, args.roi_counts, repeat=args.repeat)
+    results.update(benchmark_frames(args.repeat))
+    if args.reference:
+        results.update(
+            benchmark_samples(args.reference, collect_image_paths(args.samples))
+        )
+    report = {"environment": environment(), "results": results}
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        report["baseline"] = compare_with_baseline(
+            results, baseline["results"], args.tolerance
+        )
+        regressions = [row for row in report["baseline"] if row["regression"]]
+        for row in report["baseline"]:
+            print(
+                "{flag} {name:<40} {baseline_ms:9.3f} -> {median_ms:9.3f} ms "
+                "(x{ratio:.2f})".format(
+                    flag="!!" if row["regression"] else "  ", **row
+                ),
+                file=sys.stderr,
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,15 @@ class ProjectPaths:
     SRC_PARAMETERS_OF_REFERENCE_IMAGES: Path = (
         SRC_ASSETS_DIR / "parameters_of_reference_images"
     )
+    SRC_DECISION_RULES_OF_REFERENCE_IMAGES: Path = (
+        SRC_ASSETS_DIR / "decision_rules_of_reference_images"
+    )
+    SRC_SMOOTHING_MODES_OF_REFERENCE_IMAGES: Path = (
+        SRC_ASSETS_DIR / "smoothing_modes_of_reference_images"
+    )
+    SRC_CAMERAS_CONFIG_FILE: Path = SRC_ASSETS_DIR / "cameras.json"
+    SRC_SWEEP_SAMPLES_DIR: Path = SRC_ASSETS_DIR / "sweep_samples"
+    SRC_PARAMETER_SWEEPS_DIR: Path = SRC_ASSETS_DIR / "parameter_sweeps"
     SRC_CONFIG_DIR: Path = SRC_DIR / "config"
     SRC_DATABASE_DIR: Path = SRC_DIR / "database"
     SRC_UTILITIES_DIR: Path = SRC_DIR / "utilities"
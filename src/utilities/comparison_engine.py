@@ -0,0 +1,184 @@
+"""
+Multi-ROI comparison engine.
+
+A product frame is compared with every selected area of the reference image
+at once. The crops are taken on the calling thread and evaluated concurrently
+on a thread pool; OpenCV releases the GIL inside its filters, so the latency
+of an inspection follows the number of cores instead of the number of areas.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from src.utilities.frame_alignment import (NO_ALIGNMENT, Alignment,
+                                           FrameAligner, align_product_image,
+                                           shift_roi)
+from src.utilities.image_comparison import evaluate_similarity
+from src.utilities.image_helper import crop_areas_to_compare_from_images
+from src.utilities.instrumentation import InspectionTrace
+
+
+@dataclass
+class RoiResult:
+    """Comparison result of a single reference area."""
+
+    index: int
+    roi: tuple
+    passed: bool
+    product_roi: Optional[tuple] = None
+    scores: dict = field(default_factory=dict)
+    diff_image: Optional[np.ndarray] = None
+    elapsed: float = 0.0
+    timings: dict = field(default_factory=dict)
+    cascade_stage: Optional[str] = None
+
+    @property
+    def deciding_score(self) -> tuple[str, Optional[float]]:
+        """
+        Name and value of the score to show: SSIM when it was computed,
+        otherwise the cascade stage that settled the comparison.
+        """
+        if "ssim" in self.scores:
+            return "ssim", self.scores["ssim"]
+        if self.cascade_stage is not None:
+            return self.cascade_stage, self.scores.get(self.cascade_stage)
+        return next(iter(self.scores.items()), ("ssim", None))
+
+
+@dataclass
+class InspectionResult:
+    """Per-area results of one product frame and the aggregate verdict."""
+
+    reference_image_name: str
+    roi_results: list[RoiResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    alignment: Alignment = field(default_factory=Alignment)
+
+    @property
+    def passed(self) -> bool:
+        """A product passes only when every area passes."""
+        return bool(self.roi_results) and all(r.passed for r in self.roi_results)
+
+    @property
+    def failed_rois(self) -> list[RoiResult]:
+        return [r for r in self.roi_results if not r.passed]
+
+
+def default_worker_count() -> int:
+    return min(32, os.cpu_count() or 1)
+
+
+class ComparisonEngine:
+    """Evaluates all areas of a product frame on a shared thread pool."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        aligner: Optional[FrameAligner] = None,
+    ):
+        self.max_workers = max_workers or default_worker_count()
+        self.aligner = aligner
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="roi-compare"
+        )
+
+    def compare(
+        self,
+        reference_image_name: str,
+        reference_image,
+        product_image,
+        coordinates: list[tuple],
+        sensitivity: float = 1.0,
+        trace: Optional[InspectionTrace] = None,
+    ) -> InspectionResult:
+        """
+        Compare product_image with reference_image on every (x1, y1, x2, y2)
+        area in coordinates. With an aligner the product areas follow the
+        estimated shift of the product frame. Stage timings are added to trace,
+        the areas' ones prefixed with "roi<index>.".
+        """
+        start = time.perf_counter()
+        trace = trace or InspectionTrace(reference_image_name)
+
+        alignment = NO_ALIGNMENT
+        if self.aligner is not None:
+            with trace.stage("align"):
+                alignment = self.aligner.estimate(
+                    reference_image_name, reference_image, product_image
+                )
+                product_image = align_product_image(product_image, alignment)
+
+        # PIL görüntüleri iş parçacıkları arasında paylaşılmadan önce kırpılır
+        crop_start = time.perf_counter()
+        crops = []
+        for index, roi in enumerate(coordinates, start=1):
+            product_roi = shift_roi(roi, alignment, product_image.size)
+            crops.append(
+                (
+                    index,
+                    tuple(roi),
+                    product_roi,
+                    *crop_areas_to_compare_from_images(
+                        reference_image, roi, product_image, product_roi
+                    ),
+                )
+            )
+        trace.add("crop", (time.perf_counter() - crop_start) * 1000)
+        futures = [
+            self._executor.submit(
+                self._compare_roi,
+                reference_image_name,
+                sensitivity,
+                index,
+                roi,
+                product_roi,
+                reference_crop,
+                product_crop,
+            )
+            for index, roi, product_roi, reference_crop, product_crop in crops
+        ]
+        with trace.stage("compare"):
+            roi_results = [future.result() for future in futures]
+        for roi_result in roi_results:
+            trace.merge(roi_result.timings, prefix=f"roi{roi_result.index}.")
+
+        return InspectionResult(
+            reference_image_name=reference_image_name,
+            roi_results=roi_results,
+            elapsed=time.perf_counter() - start,
+            alignment=alignment,
+        )
+
+    @staticmethod
+    def _compare_roi(
+        reference_image_name: str,
+        sensitivity: float,
+        index: int,
+        roi: tuple,
+        product_roi: tuple,
+        reference_crop,
+        product_crop,
+    ) -> RoiResult:
+        start = time.perf_counter()
+        result = evaluate_similarity(
+            reference_image_name, sensitivity, reference_crop, product_crop, roi
+        )
+        return RoiResult(
+            index=index,
+            roi=roi,
+            product_roi=product_roi,
+            passed=result.passed,
+            scores=result.scores,
+            diff_image=result.diff_image,
+            elapsed=time.perf_counter() - start,
+            timings=result.timings,
+            cascade_stage=result.cascade_stage,
+        )
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
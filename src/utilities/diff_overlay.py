@@ -0,0 +1,99 @@
+"""
+Product image with per-area difference overlays on a Tkinter canvas.
+
+The product image, the area frames and the difference image of every failed
+area are separate canvas items. They are created once and then updated in
+place: a new inspection pastes the product frame into the same PhotoImage and
+each failed area's difference into a small PhotoImage positioned at the area.
+Areas that passed are hidden, not deleted, so a multi-area failure costs a few
+small image updates instead of one full-frame conversion per failed area.
+"""
+
+import tkinter as tk
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageTk
+
+AREA_OUTLINE = "blue"
+AREA_WIDTH = 3
+
+
+class _ImageItem:
+    """A canvas image item with a PhotoImage that is pasted into when possible."""
+
+    def __init__(self, canvas: tk.Canvas, x: int, y: int, tags: str):
+        self.canvas = canvas
+        self.photo: Optional[ImageTk.PhotoImage] = None
+        self.key = None
+        self.item = canvas.create_image(x, y, anchor="nw", tags=tags)
+
+    def show(self, image: Image.Image, x: int = 0, y: int = 0):
+        key = (image.mode, image.size)
+        if key != self.key:
+            self.photo = ImageTk.PhotoImage(image.mode, image.size)
+            self.key = key
+            self.canvas.itemconfig(self.item, image=self.photo)
+        self.photo.paste(image)
+        self.canvas.coords(self.item, x, y)
+        self.canvas.itemconfig(self.item, state="normal")
+
+    def hide(self):
+        self.canvas.itemconfig(self.item, state="hidden")
+
+
+class DiffOverlay:
+    """Draws inspection results on the product canvas with reusable items."""
+
+    def __init__(self, canvas: tk.Canvas):
+        self.canvas = canvas
+        self.reset()
+
+    def reset(self):
+        """Forget the items, e.g. after the canvas was cleared."""
+        self._product: Optional[_ImageItem] = None
+        self._areas: list[int] = []
+        self._diffs: dict[int, tuple[_ImageItem, int]] = {}
+
+    def show_product(self, image: Image.Image, areas: list[tuple]):
+        """Show the product image with a frame around every area."""
+        if self._product is None:
+            self._product = _ImageItem(self.canvas, 0, 0, "product")
+        self._product.show(image)
+        self.hide_diffs()
+
+        while len(self._areas) < len(areas):
+            self._areas.append(
+                self.canvas.create_rectangle(
+                    0, 0, 0, 0, outline=AREA_OUTLINE, width=AREA_WIDTH, tags="area"
+                )
+            )
+        for index, item in enumerate(self._areas):
+            if index < len(areas):
+                self.canvas.coords(item, *areas[index])
+                self.canvas.itemconfig(item, state="normal")
+            else:
+                self.canvas.itemconfig(item, state="hidden")
+        self.canvas.tag_raise("area")
+
+    def show_diff(self, index: int, diff_image: np.ndarray, coords: tuple):
+        """Show the difference image of area index at its product coordinates."""
+        x1, y1, x2, y2 = coords
+        if index not in self._diffs:
+            self._diffs[index] = (
+                _ImageItem(self.canvas, x1, y1, "diff"),
+                self.canvas.create_rectangle(
+                    x1, y1, x2, y2, outline=AREA_OUTLINE, width=AREA_WIDTH, tags="area"
+                ),
+            )
+        image_item, rectangle = self._diffs[index]
+        image_item.show(Image.fromarray(diff_image), x1, y1)
+        self.canvas.coords(rectangle, x1, y1, x2, y2)
+        self.canvas.itemconfig(rectangle, state="normal")
+        self.canvas.tag_raise("diff")
+        self.canvas.tag_raise("area")
+
+    def hide_diffs(self):
+        for image_item, rectangle in self._diffs.values():
+            image_item.hide()
+            self.canvas.itemconfig(rectangle, state="hidden")
@@ -0,0 +1,184 @@
+"""
+Edge-preserving smoothing modes selectable per reference.
+
+cv.bilateralFilter with the diameters chosen in ImageAdjustWindow is the most
+expensive call of the filtering chain. Besides the exact filter a reference
+can use one of these approximations, all driven by the same five saved
+parameters:
+
+- "downscale": bilateral filter on a half-size copy, upscaled back,
+- "guided": guided filter (cv.ximgproc) with radius d/2 and eps sigmaColor^2,
+- "recursive": domain transform recursive filter (cv.ximgproc.dtFilter).
+
+Running this module prints an accuracy-vs-time report of every mode against
+the exact bilateral output on the stored reference images:
+
+    python -m src.utilities.edge_preserving [--json] [reference names...]
+"""
+
+import argparse
+import json
+import time
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+from src.config import paths
+from src.utilities.file_helper import (read_last_reference_image_coordinates,
+                                       read_last_reference_image_parameters,
+                                       read_saved_reference_images_names)
+
+SMOOTHING_BILATERAL = "bilateral"
+SMOOTHING_DOWNSCALE = "downscale"
+SMOOTHING_GUIDED = "guided"
+SMOOTHING_RECURSIVE = "recursive"
+SMOOTHING_MODES = (
+    SMOOTHING_BILATERAL,
+    SMOOTHING_DOWNSCALE,
+    SMOOTHING_GUIDED,
+    SMOOTHING_RECURSIVE,
+)
+
+DOWNSCALE_FACTOR = 0.5
+
+
+def _downscaled_bilateral(image: np.ndarray, d, sigma_color, sigma_space):
+    height, width = image.shape[:2]
+    small = cv.resize(
+        image,
+        (
+            max(1, round(width * DOWNSCALE_FACTOR)),
+            max(1, round(height * DOWNSCALE_FACTOR)),
+        ),
+        interpolation=cv.INTER_AREA,
+    )
+    small = cv.bilateralFilter(
+        small,
+        max(1, round(d * DOWNSCALE_FACTOR)),
+        sigma_color,
+        sigma_space * DOWNSCALE_FACTOR,
+    )
+    return cv.resize(small, (width, height), interpolation=cv.INTER_LINEAR)
+
+
+def smooth(image: np.ndarray, params: tuple, mode: str = SMOOTHING_BILATERAL):
+    """
+    Edge-preserving smoothing of a gray image with the (d, sigmaColor,
+    sigmaSpace) values of the reference parameters.
+    """
+    d, sigma_color, sigma_space = params[0], params[1], params[2]
+    if mode == SMOOTHING_BILATERAL:
+        return cv.bilateralFilter(image, d, sigma_color, sigma_space)
+    if mode == SMOOTHING_DOWNSCALE:
+        return _downscaled_bilateral(image, d, sigma_color, sigma_space)
+    if mode == SMOOTHING_GUIDED:
+        return cv.ximgproc.guidedFilter(
+            image, image, max(1, d // 2), max(float(sigma_color), 1.0) ** 2
+        )
+    if mode == SMOOTHING_RECURSIVE:
+        return cv.ximgproc.dtFilter(
+            image,
+            image,
+            max(float(sigma_space), 1.0),
+            max(float(sigma_color), 1.0),
+            cv.ximgproc.DTF_RF,
+        )
+    raise ValueError(f"Unknown smoothing mode: {mode}")
+
+
+def _edge_f1(expected: np.ndarray, actual: np.ndarray) -> float:
+    expected = expected > 0
+    actual = actual > 0
+    true_positive = np.count_nonzero(expected & actual)
+    total = np.count_nonzero(expected) + np.count_nonzero(actual)
+    return 1.0 if total == 0 else 2 * true_positive / total
+
+
+def _timed(function, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def compare_smoothing_modes(
+    image: np.ndarray, params: tuple, modes=SMOOTHING_MODES, repeat: int = 3
+) -> list[dict]:
+    """
+    Time of every mode and its deviation from the exact bilateral output:
+    mean absolute difference, PSNR and F1 agreement of the Canny edges.
+    """
+    exact, exact_ms = _timed(lambda: smooth(image, params), repeat)
+    exact_edges = cv.Canny(exact, params[3], params[4])
+    rows = []
+    for mode in modes:
+        output, elapsed_ms = _timed(lambda: smooth(image, params, mode), repeat)
+        rows.append(
+            {
+                "mode": mode,
+                "time_ms": elapsed_ms,
+                "speedup": exact_ms / elapsed_ms if elapsed_ms else 0.0,
+                "mean_abs_diff": float(cv.absdiff(exact, output).mean()),
+                "psnr": float(cv.PSNR(exact, output)),
+                "edge_f1": _edge_f1(
+                    exact_edges, cv.Canny(output, params[3], params[4])
+                ),
+            }
+        )
+    return rows
+
+
+def smoothing_report(reference_image_names=None, repeat: int = 3) -> list[dict]:
+    """Accuracy-vs-time rows of every mode on the ROIs of stored references."""
+    if not reference_image_names:
+        reference_image_names = read_saved_reference_images_names()
+
+    report = []
+    for name in reference_image_names:
+        image_path = paths.SRC_REFERENCE_IMAGES_DIR.joinpath(f"{name}.png")
+        if not image_path.exists():
+            continue
+        try:
+            params = read_last_reference_image_parameters(name)
+            coordinates = read_last_reference_image_coordinates(name)
+        except (OSError, ValueError):
+            # Eksik veya bozuk parametre/koordinat dosyası olan referansı atla
+            continue
+        gray = cv.cvtColor(
+            np.array(Image.open(image_path).convert("RGB")), cv.COLOR_RGB2GRAY
+        )
+        for index, coords in enumerate(coordinates, start=1):
+            if len(coords) != 4:
+                continue
+            x1, y1, x2, y2 = coords
+            roi = gray[y1:y2, x1:x2]
+            if roi.shape[0] < 2 or roi.shape[1] < 2:
+                continue
+            for row in compare_smoothing_modes(roi, params, repeat=repeat):
+                report.append(dict(row, reference=name, roi=index))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Accuracy vs. time of the smoothing modes on stored references."
+    )
+    parser.add_argument("references", nargs="*", help="Reference names (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    for row in smoothing_report(args.references, args.repeat):
+        if args.json:
+            print(json.dumps(row))
+        else:
+            print(
+                "{reference:<20} alan {roi:<3} {mode:<10} {time_ms:8.2f} ms "
+                "x{speedup:5.1f}  MAD {mean_abs_diff:6.2f}  PSNR {psnr:6.2f}  "
+                "kenar F1 {edge_f1:5.3f}".format(**row)
+            )
+
+
+if __name__ == "__main__":
+    main()
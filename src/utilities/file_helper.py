@@ -1,3 +1,5 @@
+import json
+
 from src.config import paths
 
 
@@ -61,6 +63,56 @@ def read_last_reference_image_parameters(reference_image_name: str):
     return values_of_parameters
 
 
+def reference_image_decision_rule_path(reference_image_name: str):
+    return paths.SRC_DECISION_RULES_OF_REFERENCE_IMAGES.joinpath(
+        "".join([reference_image_name, ".json"])
+    )
+
+
+def write_reference_image_decision_rule(reference_image_name: str, rule: dict):
+    file_path = reference_image_decision_rule_path(reference_image_name)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with file_path.open("w", encoding="utf-8") as file:
+        json.dump(rule, file, indent=4)
+
+
+def read_reference_image_decision_rule(reference_image_name: str):
+    file_path = reference_image_decision_rule_path(reference_image_name)
+    if not file_path.exists():
+        return None
+    with file_path.open("r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_cameras_config(file_path=None):
+    file_path = file_path or paths.SRC_CAMERAS_CONFIG_FILE
+    if not file_path.exists():
+        return None
+    with file_path.open("r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def reference_image_smoothing_mode_path(reference_image_name: str):
+    return paths.SRC_SMOOTHING_MODES_OF_REFERENCE_IMAGES.joinpath(
+        "".join([reference_image_name, ".txt"])
+    )
+
+
+def write_reference_image_smoothing_mode(reference_image_name: str, mode: str):
+    file_path = reference_image_smoothing_mode_path(reference_image_name)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with file_path.open("w", encoding="utf-8") as file:
+        file.write(mode)
+
+
+def read_reference_image_smoothing_mode(reference_image_name: str):
+    file_path = reference_image_smoothing_mode_path(reference_image_name)
+    if not file_path.exists():
+        return None
+    with file_path.open("r", encoding="utf-8") as file:
+        return file.read().strip() or None
+
+
 def write_reference_images_names_from_entry(reference_image_name: str):
     if reference_image_name in read_saved_reference_images_names():
         return
@@ -0,0 +1,231 @@
+"""
+Coarse-to-fine registration of a product frame to the reference frame.
+
+Reference areas are cropped from the product frame at the reference canvas
+coordinates, so a product shifted by a few pixels on the conveyor drags every
+area off its logo. The aligner estimates the product-to-reference translation
+once per frame with phase correlation on a downsampled pyramid, refines it one
+level up inside a bounded window and, optionally, estimates a small rotation
+with ECC on the coarse level. The ROI crops are then shifted accordingly.
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+from src.utilities.reference_cache import reference_source_mtime, to_gray
+
+
+@dataclass
+class Alignment:
+    """Translation (and rotation in degrees) of the product frame."""
+
+    dx: float = 0.0
+    dy: float = 0.0
+    angle: float = 0.0
+    response: float = 0.0
+    reliable: bool = False
+    warp: Optional[np.ndarray] = None
+
+    @property
+    def has_rotation(self) -> bool:
+        return self.warp is not None and abs(self.angle) > 0.05
+
+
+NO_ALIGNMENT = Alignment()
+
+
+def _pyramid(image: np.ndarray, levels: int) -> list[np.ndarray]:
+    pyramid = [image.astype(np.float32)]
+    for _ in range(levels):
+        pyramid.append(cv.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def _dft_size(size: int) -> int:
+    """Largest size not above size that OpenCV's DFT handles efficiently."""
+    while size > 1 and cv.getOptimalDFTSize(size) != size:
+        size -= 1
+    return size
+
+
+class FrameAligner:
+    """
+    Estimates the alignment of product frames to one reference frame.
+    The reference pyramid is built once per reference and kept until the
+    reference files change.
+    """
+
+    def __init__(
+        self,
+        levels: int = 2,
+        max_shift: int = 40,
+        min_response: float = 0.1,
+        estimate_rotation: bool = False,
+        max_angle: float = 3.0,
+        refine_window: int = 256,
+    ):
+        self.levels = levels
+        self.max_shift = max_shift
+        self.min_response = min_response
+        self.estimate_rotation = estimate_rotation
+        self.max_angle = max_angle
+        self.refine_window = refine_window
+        self._reference_key = None
+        self._reference_pyramid = None
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _reference(self, reference_image_name: str, reference_image):
+        key = (reference_image_name, reference_source_mtime(reference_image_name))
+        with self._lock:
+            if key != self._reference_key:
+                self._reference_pyramid = _pyramid(
+                    to_gray(reference_image), self.levels
+                )
+                self._reference_key = key
+            return self._reference_pyramid
+
+    def _window(self, shape: tuple) -> np.ndarray:
+        window = self._windows.get(shape)
+        if window is None:
+            window = cv.createHanningWindow(shape[::-1], cv.CV_32F)
+            self._windows[shape] = window
+        return window
+
+    def _phase_correlate(self, reference: np.ndarray, product: np.ndarray):
+        # phaseCorrelate pencereyi float32 girdilere yerinde uygular; kopya verilir
+        return cv.phaseCorrelate(
+            reference.copy(), product.copy(), self._window(reference.shape)
+        )
+
+    def estimate(
+        self, reference_image_name: str, reference_image, product_image
+    ) -> Alignment:
+        """
+        Alignment of product_image to reference_image. An unreliable estimate
+        (weak correlation peak or shift outside max_shift) is reported with
+        reliable=False and zero shift.
+        """
+        reference_pyramid = self._reference(reference_image_name, reference_image)
+        product_gray = to_gray(product_image)
+        if product_gray.shape != reference_pyramid[0].shape:
+            return NO_ALIGNMENT
+        product_pyramid = _pyramid(product_gray, self.levels)
+
+        # En kaba seviyede tüm görüntü üzerinde faz korelasyonu
+        coarse_reference = reference_pyramid[-1]
+        coarse_product = product_pyramid[-1]
+        (dx, dy), response = self._phase_correlate(coarse_reference, coarse_product)
+        scale = 2**self.levels
+        dx, dy = dx * scale, dy * scale
+        if response < self.min_response or max(abs(dx), abs(dy)) > self.max_shift:
+            return Alignment(response=response)
+
+        if self.levels > 0:
+            dx, dy = self._refine(reference_pyramid[1], product_pyramid[1], dx, dy)
+
+        alignment = Alignment(dx=dx, dy=dy, response=response, reliable=True)
+        if self.estimate_rotation:
+            self._estimate_rotation(coarse_reference, coarse_product, alignment, scale)
+        return alignment
+
+    def _refine(
+        self, reference: np.ndarray, product: np.ndarray, dx: float, dy: float
+    ) -> tuple[float, float]:
+        """
+        Residual phase correlation on a window of the overlap one level above
+        the coarsest, bounded to half a coarse pixel step.
+        """
+        height, width = reference.shape
+        sx, sy = int(round(dx / 2)), int(round(dy / 2))
+        x0, y0 = max(0, -sx), max(0, -sy)
+        x1, y1 = min(width, width - sx), min(height, height - sy)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return dx, dy
+
+        # Örtüşen alanın ortasından DFT için uygun boyutta bir pencere al
+        window_width = _dft_size(min(x1 - x0, self.refine_window))
+        window_height = _dft_size(min(y1 - y0, self.refine_window))
+        x0 += (x1 - x0 - window_width) // 2
+        y0 += (y1 - y0 - window_height) // 2
+        x1, y1 = x0 + window_width, y0 + window_height
+
+        (rx, ry), _ = self._phase_correlate(
+            reference[y0:y1, x0:x1], product[y0 + sy : y1 + sy, x0 + sx : x1 + sx]
+        )
+        bound = 2 ** (self.levels - 1)
+        if max(abs(rx), abs(ry)) > bound:
+            return dx, dy
+        return (sx + rx) * 2, (sy + ry) * 2
+
+    def _estimate_rotation(
+        self,
+        reference: np.ndarray,
+        product: np.ndarray,
+        alignment: Alignment,
+        scale: int,
+    ):
+        warp = np.array(
+            [[1, 0, alignment.dx / scale], [0, 1, alignment.dy / scale]],
+            dtype=np.float32,
+        )
+        criteria = (cv.TERM_CRITERIA_EPS | cv.TERM_CRITERIA_COUNT, 30, 1e-4)
+        # findTransformECC da float32 girdileri yerinde bulanıklaştırır
+        try:
+            _, warp = cv.findTransformECC(
+                reference.copy(),
+                product.copy(),
+                warp,
+                cv.MOTION_EUCLIDEAN,
+                criteria,
+                None,
+                5,
+            )
+        except cv.error:
+            return
+        angle = math.degrees(math.atan2(warp[1, 0], warp[0, 0]))
+        if abs(angle) > self.max_angle:
+            return
+        warp[:, 2] *= scale
+        alignment.angle = angle
+        alignment.dx, alignment.dy = float(warp[0, 2]), float(warp[1, 2])
+        alignment.warp = warp
+
+
+def align_product_image(product_image: Image.Image, alignment: Alignment):
+    """
+    Rotate the product frame back onto the reference frame. Only needed when
+    the alignment contains a rotation; translations are applied to the ROIs.
+    """
+    if not alignment.has_rotation:
+        return product_image
+    product_array = np.asarray(product_image)
+    height, width = product_array.shape[:2]
+    aligned = cv.warpAffine(
+        product_array,
+        alignment.warp,
+        (width, height),
+        flags=cv.INTER_LINEAR | cv.WARP_INVERSE_MAP,
+        borderMode=cv.BORDER_REPLICATE,
+    )
+    return Image.fromarray(aligned)
+
+
+def shift_roi(roi: tuple, alignment: Alignment, image_size: tuple) -> tuple:
+    """
+    Product-side (x1, y1, x2, y2) area for a reference ROI, shifted by the
+    alignment and kept inside the image with its size unchanged.
+    """
+    if not alignment.reliable or alignment.has_rotation:
+        return tuple(roi)
+    width, height = image_size
+    x1, y1, x2, y2 = roi
+    dx = min(max(round(alignment.dx), -x1), width - x2)
+    dy = min(max(round(alignment.dy), -y1), height - y2)
+    return x1 + dx, y1 + dy, x2 + dx, y2 + dy
@@ -0,0 +1,739 @@
+"""
+Frame sources for VideoStreamHandler.
+
+A frame source delivers BGR (or, in mono mode, gray) frames of the 800x600
+inspection window to the grab thread of VideoStreamHandler:
+
+- PylonFrameSource: a Basler camera by serial number (or the first one),
+  with the camera-side window and Mono8 capture (CAMERA_ROI, CAMERA_MONO).
+- VideoFileSource: a video file read with cv.VideoCapture.
+- ImageDirectorySource: image files of a directory, played in name order.
+- SyntheticSource: generated labels (synthetic_labels), some with defects.
+
+Frames follow the application's channel convention: camera and video
+frames are passed on as grabbed, and arrays go through Image.fromarray
+unchanged both for inspection and for the archive. Images of a directory
+are therefore read with PIL, so a replayed archive frame is the same array
+that was recorded.
+
+Playback sources either keep the real frame rate ("realtime") or deliver
+frames as fast as they can be read ("fast"), so the throughput of the
+inspection loop can be measured without a camera. The application picks the
+source from FRAME_SOURCE, e.g. "pylon", "pylon:<serial>", "video:line.mp4",
+"images:data/run1", "synthetic" or "synthetic:conveyor" (parts entering,
+stopping and leaving), and the pacing from FRAME_SOURCE_PACING.
+
+    python -m src.utilities.frame_sources synthetic --pacing fast --seconds 5
+    python -m src.utilities.frame_sources images:data/run1 --reference coffe
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+from pypylon import genicam, pylon
+
+from src.config import logger, paths
+from src.utilities.comparison_engine import ComparisonEngine
+from src.utilities.file_helper import read_last_reference_image_coordinates
+from src.utilities.synthetic_labels import (DEFECTS, perturb, synthetic_frame,
+                                            with_defect)
+
+INSPECTION_WIDTH = 800
+INSPECTION_HEIGHT = 600
+GRAB_TIMEOUT_MS = 1000
+CLOCK_SYNC_INTERVAL = 60.0
+
+CAMERA_ROI = os.getenv("CAMERA_ROI", "1") == "1"
+# Mono8 isteğe bağlıdır: "1" açar, "auto" yalnızca tüm referanslar gri kayıtlıysa
+CAMERA_MONO = os.getenv("CAMERA_MONO", "0")
+FRAME_SOURCE = os.getenv("FRAME_SOURCE", "pylon")
+
+PACING_REALTIME = "realtime"
+PACING_FAST = "fast"
+PACING_MODES = (PACING_REALTIME, PACING_FAST)
+FRAME_SOURCE_PACING = os.getenv("FRAME_SOURCE_PACING", PACING_REALTIME)
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+
+
+@dataclass
+class Frame:
+    """A frame of the inspection window (BGR, or gray in mono mode)."""
+
+    image: np.ndarray
+    timestamp: float  # time.monotonic() when the exposure started
+    frame_number: int
+    camera_timestamp: int = 0
+    latency: float = 0.0  # exposure start to ring buffer in seconds
+
+
+def _aligned(value: int, node) -> int:
+    """value rounded down to the increment of a GenICam integer node."""
+    value = min(max(value, node.Min), node.Max)
+    return node.Min + (value - node.Min) // node.Inc * node.Inc
+
+
+def _node_value(camera, *names):
+    """Value of the first readable node of names, None if there is none."""
+    node_map = camera.GetNodeMap()
+    for name in names:
+        node = node_map.GetNode(name)
+        if node is not None and genicam.IsReadable(node):
+            return node.GetValue()
+    return None
+
+
+def center_crop(image: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Center window of width x height, or the whole image if it is smaller."""
+    image_height, image_width = image.shape[:2]
+    row = max(0, (image_height - height) // 2)
+    col = max(0, (image_width - width) // 2)
+    return image[row : row + height, col : col + width]
+
+
+class FrameSource:
+    """
+    Interface of the frame sources. grab() is only called from the grab
+    thread; it returns None when no frame arrived within the timeout.
+    """
+
+    name = "source"
+
+    def __init__(self, mono: bool = False):
+        self.mono = mono
+        self.skipped = 0
+        self.exhausted = False
+
+    def open(self):
+        """Start delivering frames."""
+
+    def close(self):
+        """Stop delivering frames and release the device or file."""
+
+    def grab(self) -> Optional[Frame]:
+        raise NotImplementedError
+
+    @property
+    def is_open(self) -> bool:
+        return True
+
+    def configure(self, camera_roi: Optional[bool] = None, mono: Optional[bool] = None):
+        """Change the acquisition settings; called while the source is closed."""
+        if mono is not None:
+            self.mono = mono
+
+    def describe(self) -> dict:
+        return {"source": self.name, "mono": self.mono}
+
+
+def list_cameras() -> list[dict]:
+    """Serial number, model and name of every Basler camera that is attached."""
+    return [
+        {
+            "serial": device.GetSerialNumber(),
+            "model": device.GetModelName(),
+            "name": device.GetFriendlyName(),
+        }
+        for device in pylon.TlFactory.GetInstance().EnumerateDevices()
+    ]
+
+
+class PylonFrameSource(FrameSource):
+    """
+    A Basler camera, chosen by serial number or the first available one
+    when no serial is given. The camera itself is programmed to the
+    inspection window (OffsetX/OffsetY/Width/Height) so only that window is
+    transferred and converted; with mono=True frames are grabbed as Mono8 and
+    used without colour conversion.
+
+    Frame timestamps are the start of the exposure on the host's monotonic
+    clock: the camera's tick counter is latched against time.monotonic()
+    when grabbing starts and every CLOCK_SYNC_INTERVAL seconds. Cameras
+    without a latchable counter get a conservative estimate, the arrival
+    time minus the exposure time and one frame interval.
+    """
+
+    name = "pylon"
+
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        camera_roi: bool = CAMERA_ROI,
+        mono: bool = False,
+        serial: Optional[str] = None,
+    ):
+        super().__init__(mono)
+        self.camera_roi = camera_roi
+        self.start_row = int((height - INSPECTION_HEIGHT) / 2)
+        self.start_col = int((width - INSPECTION_WIDTH) / 2)
+        self.end_row = self.start_row + INSPECTION_HEIGHT
+        self.end_col = self.start_col + INSPECTION_WIDTH
+        # Kameradan gelen görüntü içindeki kırpma penceresi
+        self.crop = (
+            slice(self.start_row, self.end_row),
+            slice(self.start_col, self.end_col),
+        )
+        self.converter = pylon.ImageFormatConverter()
+
+        # converting to opencv bgr format
+        self.converter.OutputPixelFormat = pylon.PixelType_BGR8packed
+        self.converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        self._convert = True
+        self._color_pixel_format = None
+        self._clock_offset = None
+        self._clock_synced_at = 0.0
+        self._tick_seconds = 1e-9
+        self._arrival_delay = 0.0
+
+        # connecting to the camera with the serial, or the first available one
+        device_info = pylon.DeviceInfo()
+        if serial:
+            device_info.SetSerialNumber(serial)
+        self.camera = pylon.InstantCamera(
+            pylon.TlFactory.GetInstance().CreateFirstDevice(device_info)
+        )
+        self.serial = self.camera.GetDeviceInfo().GetSerialNumber()
+        self.camera.Open()
+        # Kameranın renkli piksel biçimi; Mono8 kapatılınca geri yüklenir
+        self._color_pixel_format = self.camera.PixelFormat.Value
+        self._configure_acquisition()
+
+    def _configure_acquisition(self):
+        """
+        Program the pixel format and the camera-side window. Has to run while
+        the camera is not grabbing.
+        """
+        camera = self.camera
+        pixel_formats = camera.PixelFormat.Symbolics
+        if self.mono and "Mono8" in pixel_formats:
+            camera.PixelFormat.Value = "Mono8"
+            self._convert = False
+        else:
+            if camera.PixelFormat.Value != self._color_pixel_format:
+                camera.PixelFormat.Value = self._color_pixel_format
+            # Kamera Mono8 veremiyorsa dönüştürücü doğrudan griye çevirir
+            self.converter.OutputPixelFormat = (
+                pylon.PixelType_Mono8 if self.mono else pylon.PixelType_BGR8packed
+            )
+            self._convert = True
+
+        # Pencere küçültülmeden önce ofsetler sıfırlanır, sonra yeniden yazılır
+        camera.OffsetX.Value = camera.OffsetX.Min
+        camera.OffsetY.Value = camera.OffsetY.Min
+        if not self.camera_roi:
+            # Açılıştaki pencere önceki çalıştırmadan kalmış olabilir; tüm sensör
+            # okunur, ofsetler sıfırlandığı için Max sensörün tamamıdır
+            camera.Width.Value = camera.Width.Max
+            camera.Height.Value = camera.Height.Max
+            self.crop = (
+                slice(self.start_row, self.end_row),
+                slice(self.start_col, self.end_col),
+            )
+            return
+
+        # Artım (Inc) kısıtları yüzünden pencere biraz büyük çıkabilir;
+        # fazlası yazılımda kırpılır
+        width = _aligned(
+            -(-INSPECTION_WIDTH // camera.Width.Inc) * camera.Width.Inc, camera.Width
+        )
+        height = _aligned(
+            -(-INSPECTION_HEIGHT // camera.Height.Inc) * camera.Height.Inc,
+            camera.Height,
+        )
+        camera.Width.Value = width
+        camera.Height.Value = height
+        offset_x = _aligned(min(self.start_col, camera.OffsetX.Max), camera.OffsetX)
+        offset_y = _aligned(min(self.start_row, camera.OffsetY.Max), camera.OffsetY)
+        camera.OffsetX.Value = offset_x
+        camera.OffsetY.Value = offset_y
+        row = min(self.start_row - offset_y, height - INSPECTION_HEIGHT)
+        col = min(self.start_col - offset_x, width - INSPECTION_WIDTH)
+        self.crop = (
+            slice(max(row, 0), max(row, 0) + INSPECTION_HEIGHT),
+            slice(max(col, 0), max(col, 0) + INSPECTION_WIDTH),
+        )
+        logger.info(
+            msg=f"Camera window {width}x{height}+{offset_x}+{offset_y}, "
+            f"pixel format {camera.PixelFormat.Value}"
+        )
+
+    def _sync_clock(self):
+        """Map the camera's tick counter to time.monotonic()."""
+        camera = self.camera
+        self._clock_synced_at = time.monotonic()
+        frequency = _node_value(camera, "GevTimestampTickFrequency")
+        self._tick_seconds = 1 / frequency if frequency else 1e-9
+        for latch, value in (
+            ("TimestampLatch", "TimestampLatchValue"),
+            ("GevTimestampControlLatch", "GevTimestampValue"),
+        ):
+            node = camera.GetNodeMap().GetNode(latch)
+            if node is None or not genicam.IsWritable(node):
+                continue
+            before = time.monotonic()
+            node.Execute()
+            after = time.monotonic()
+            ticks = _node_value(camera, value)
+            # Mandal iki okuma arasında alınır; ortası en iyi tahmindir
+            self._clock_offset = (before + after) / 2 - ticks * self._tick_seconds
+            return
+        self._clock_offset = None
+        exposure = _node_value(camera, "ExposureTime", "ExposureTimeAbs") or 0.0
+        frame_rate = _node_value(camera, "ResultingFrameRate", "ResultingFrameRateAbs")
+        self._arrival_delay = exposure / 1e6 + (1 / frame_rate if frame_rate else 0.0)
+
+    def _exposure_start(self, camera_timestamp: int, arrived: float) -> float:
+        if self._clock_offset is None or not camera_timestamp:
+            return arrived - self._arrival_delay
+        return camera_timestamp * self._tick_seconds + self._clock_offset
+
+    def configure(self, camera_roi: Optional[bool] = None, mono: Optional[bool] = None):
+        if camera_roi is not None:
+            self.camera_roi = camera_roi
+        super().configure(mono=mono)
+        self._configure_acquisition()
+
+    def open(self):
+        self._sync_clock()
+        # Grabing Continuously (video) with minimal delay
+        self.camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
+
+    def close(self):
+        if self.camera.IsGrabbing():
+            self.camera.StopGrabbing()
+
+    @property
+    def is_open(self) -> bool:
+        return self.camera.IsGrabbing()
+
+    def grab(self) -> Optional[Frame]:
+        if time.monotonic() - self._clock_synced_at > CLOCK_SYNC_INTERVAL:
+            # Kamera saati kayar; eşleme arada yenilenir
+            self._sync_clock()
+        grab_result = self.camera.RetrieveResult(
+            GRAB_TIMEOUT_MS, pylon.TimeoutHandling_Return
+        )
+        if grab_result is None or not grab_result.IsValid():
+            return None
+        arrived = time.monotonic()
+        try:
+            if not grab_result.GrabSucceeded():
+                raise RuntimeError(grab_result.GetErrorDescription())
+            if self._convert:
+                array = self.converter.Convert(grab_result).GetArray()
+            else:
+                array = grab_result.GetArray()
+            self.skipped += grab_result.GetNumberOfSkippedImages()
+            # Pylon belleği serbest bırakılmadan önce kırpılmış kopya alınır
+            camera_timestamp = grab_result.GetTimeStamp()
+            return Frame(
+                image=array[self.crop].copy(),
+                timestamp=self._exposure_start(camera_timestamp, arrived),
+                frame_number=grab_result.GetImageNumber(),
+                camera_timestamp=camera_timestamp,
+            )
+        finally:
+            grab_result.Release()
+
+    def describe(self) -> dict:
+        return dict(super().describe(), serial=self.serial, camera_roi=self.camera_roi)
+
+
+class PlaybackSource(FrameSource):
+    """
+    Base of the sources that replay frames at fps ("realtime" pacing) or as
+    fast as they can be produced ("fast"). With loop the playback starts over
+    at the end, otherwise the source is exhausted.
+    """
+
+    def __init__(
+        self,
+        fps: float = 30.0,
+        pacing: str = FRAME_SOURCE_PACING,
+        loop: bool = True,
+        mono: bool = False,
+    ):
+        if pacing not in PACING_MODES:
+            raise ValueError(f"Unknown frame source pacing: {pacing}")
+        super().__init__(mono)
+        self.fps = fps
+        self.pacing = pacing
+        self.loop = loop
+        self.frame_number = 0
+        self._next_time = None
+
+    def open(self):
+        self.exhausted = False
+        self._next_time = time.monotonic()
+
+    def _read(self) -> Optional[np.ndarray]:
+        """Next BGR frame of the playback, None at the end."""
+        raise NotImplementedError
+
+    def _rewind(self):
+        raise NotImplementedError
+
+    def grab(self) -> Optional[Frame]:
+        image = self._read()
+        if image is None and self.loop:
+            self._rewind()
+            image = self._read()
+        if image is None:
+            self.exhausted = True
+            return None
+
+        if self.pacing == PACING_REALTIME and self.fps > 0:
+            delay = self._next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Geride kalınan kareler atlanmış sayılır
+                self.skipped += int(-delay * self.fps)
+            self._next_time = max(self._next_time, time.monotonic()) + 1 / self.fps
+
+        arrived = time.monotonic()
+        image = center_crop(image, INSPECTION_WIDTH, INSPECTION_HEIGHT)
+        if self.mono and image.ndim == 3:
+            image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+        self.frame_number += 1
+        return Frame(
+            image=np.ascontiguousarray(image),
+            timestamp=arrived,
+            frame_number=self.frame_number,
+            camera_timestamp=time.monotonic_ns(),
+        )
+
+    def describe(self) -> dict:
+        return dict(super().describe(), fps=self.fps, pacing=self.pacing)
+
+
+class VideoFileSource(PlaybackSource):
+    """Frames of a video file; realtime pacing uses the frame rate of the file."""
+
+    name = "video"
+
+    def __init__(self, path, fps: Optional[float] = None, **kwargs):
+        self.path = str(path)
+        self.capture = cv.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Cannot open video file: {self.path}")
+        file_fps = self.capture.get(cv.CAP_PROP_FPS)
+        super().__init__(fps=fps or file_fps or 30.0, **kwargs)
+
+    def open(self):
+        # close() bırakır; set_acquisition sonrası dosya yeniden açılır
+        if not self.capture.isOpened() and not self.capture.open(self.path):
+            raise ValueError(f"Cannot open video file: {self.path}")
+        super().open()
+
+    def _read(self) -> Optional[np.ndarray]:
+        ok, image = self.capture.read()
+        return image if ok else None
+
+    def _rewind(self):
+        self.capture.set(cv.CAP_PROP_POS_FRAMES, 0)
+
+    def close(self):
+        self.capture.release()
+
+    @property
+    def is_open(self) -> bool:
+        return self.capture.isOpened()
+
+    def describe(self) -> dict:
+        return dict(super().describe(), path=self.path)
+
+
+class ImageDirectorySource(PlaybackSource):
+    """Image files of a directory, played in name order."""
+
+    name = "images"
+
+    def __init__(self, directory, fps: float = 10.0, **kwargs):
+        super().__init__(fps=fps, **kwargs)
+        self.directory = Path(directory)
+        self.image_paths = sorted(
+            path
+            for path in self.directory.iterdir()
+            if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES
+        )
+        if not self.image_paths:
+            raise ValueError(f"No images in {self.directory}")
+        self._index = 0
+
+    def _read(self) -> Optional[np.ndarray]:
+        while self._index < len(self.image_paths):
+            path = self.image_paths[self._index]
+            self._index += 1
+            try:
+                with Image.open(path) as image:
+                    if image.mode not in ("L", "RGB"):
+                        image = image.convert("RGB")
+                    # Arşivle aynı kanal sırası: kare PIL ile olduğu gibi yazıldı
+                    return np.asarray(image)
+            except OSError:
+                logger.warning(msg=f"Skipping unreadable image: {path}")
+        return None
+
+    def _rewind(self):
+        self._index = 0
+
+    def describe(self) -> dict:
+        return dict(
+            super().describe(),
+            directory=str(self.directory),
+            images=len(self.image_paths),
+        )
+
+
+class SyntheticSource(PlaybackSource):
+    """
+    Frames of generated labels on a conveyor background. Good products are
+    perturbed copies of the same frame; defect_rate of them carry a defect.
+    A fixed number of variants is generated up front so that producing a
+    frame costs no more than copying it.
+
+    With conveyor=True every part slides in over the empty conveyor, stands
+    still for stable_frames frames and slides out again, as a part on a
+    stopping line would, so that presence gating can be exercised.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        roi_size: tuple[int, int] = (200, 150),
+        roi_count: int = 4,
+        defect_rate: float = 0.1,
+        variants: int = 32,
+        seed: int = 0,
+        fps: float = 30.0,
+        conveyor: bool = False,
+        empty_frames: int = 10,
+        travel_frames: int = 12,
+        stable_frames: int = 15,
+        **kwargs,
+    ):
+        super().__init__(fps=fps, **kwargs)
+        self.background, _ = synthetic_frame(
+            roi_size, 0, (INSPECTION_WIDTH, INSPECTION_HEIGHT), seed
+        )
+        self.background = cv.cvtColor(self.background, cv.COLOR_RGB2BGR)
+        self.frame, self.rois = synthetic_frame(
+            roi_size, roi_count, (INSPECTION_WIDTH, INSPECTION_HEIGHT), seed
+        )
+        rng = np.random.default_rng(seed)
+        self.variants = []
+        self.defective = []
+        for index in range(variants):
+            frame = perturb(self.frame, seed + index)
+            defective = bool(rng.random() < defect_rate)
+            if defective:
+                x1, y1, x2, y2 = self.rois[int(rng.integers(len(self.rois)))]
+                defect = DEFECTS[int(rng.integers(len(DEFECTS)))]
+                frame[y1:y2, x1:x2] = with_defect(
+                    frame[y1:y2, x1:x2], defect, seed + index
+                )
+            # Kamera gibi BGR kare verilir
+            self.variants.append(cv.cvtColor(frame, cv.COLOR_RGB2BGR))
+            self.defective.append(defective)
+
+        self.conveyor = conveyor
+        self._label_mask = np.zeros(self.frame.shape[:2], dtype=bool)
+        for x1, y1, x2, y2 in self.rois:
+            self._label_mask[y1:y2, x1:x2] = True
+        # Bir parçanın kareleri: (x kayması, None ise bant boş)
+        travel = np.linspace(INSPECTION_WIDTH, 0, travel_frames, endpoint=False)
+        self._part_offsets = (
+            [None] * empty_frames
+            + [-int(dx) for dx in travel]
+            + [0] * stable_frames
+            + [int(dx) for dx in travel[::-1]]
+        )
+        self._index = 0
+
+    def _conveyor_frame(self, variant: np.ndarray, dx: Optional[int]) -> np.ndarray:
+        image = self.background.copy()
+        if dx is None or abs(dx) >= INSPECTION_WIDTH:
+            return image
+        width = INSPECTION_WIDTH - abs(dx)
+        source = slice(max(0, -dx), max(0, -dx) + width)
+        target = slice(max(0, dx), max(0, dx) + width)
+        mask = self._label_mask[:, source]
+        image[:, target][mask] = variant[:, source][mask]
+        return image
+
+    def _read(self) -> Optional[np.ndarray]:
+        if not self.conveyor:
+            image = self.variants[self._index % len(self.variants)].copy()
+        else:
+            part, step = divmod(self._index, len(self._part_offsets))
+            image = self._conveyor_frame(
+                self.variants[part % len(self.variants)], self._part_offsets[step]
+            )
+        self._index += 1
+        return image
+
+    def _rewind(self):
+        self._index = 0
+
+    @property
+    def frames_per_part(self) -> int:
+        return len(self._part_offsets) if self.conveyor else 1
+
+    def describe(self) -> dict:
+        return dict(
+            super().describe(),
+            rois=len(self.rois),
+            variants=len(self.variants),
+            conveyor=self.conveyor,
+        )
+
+
+def create_frame_source(
+    spec: str = FRAME_SOURCE,
+    width: int = 1920,
+    height: int = 1080,
+    camera_roi: bool = CAMERA_ROI,
+    mono: bool = False,
+    pacing: str = FRAME_SOURCE_PACING,
+    loop: bool = True,
+) -> FrameSource:
+    """
+    Frame source of a spec: "pylon", "pylon:<serial>", "video:<file>",
+    "images:<directory>", "synthetic" or "synthetic:conveyor".
+    """
+    kind, _, argument = spec.partition(":")
+    if kind == "pylon":
+        return PylonFrameSource(
+            width, height, camera_roi=camera_roi, mono=mono, serial=argument or None
+        )
+    if kind == "video":
+        return VideoFileSource(argument, pacing=pacing, loop=loop, mono=mono)
+    if kind == "images":
+        return ImageDirectorySource(argument, pacing=pacing, loop=loop, mono=mono)
+    if kind == "synthetic":
+        return SyntheticSource(
+            conveyor=argument == "conveyor", pacing=pacing, loop=loop, mono=mono
+        )
+    raise ValueError(f"Unknown frame source: {spec}")
+
+
+def measure_grab_throughput(source: FrameSource, seconds: float = 5.0) -> dict:
+    """
+    Run a VideoStreamHandler on source for the given time; returns its grab
+    statistics and the frames per second.
+    """
+    # video_stream_handler bu modülü içe aktarır; döngüsel içe aktarmayı önler
+    from src.utilities.video_stream_handler import VideoStreamHandler
+
+    handler = VideoStreamHandler(source=source)
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < seconds and handler.running:
+            time.sleep(0.05)
+    finally:
+        elapsed = time.monotonic() - start
+        handler.release()
+    stats = handler.stats()
+    stats.update(
+        elapsed_s=elapsed,
+        frames_per_s=stats["grabbed"] / elapsed if elapsed else 0.0,
+    )
+    return stats
+
+
+def measure_inspection_throughput(
+    source: FrameSource, reference_image_name: str, seconds: float = 5.0
+) -> dict:
+    """
+    Inspect frames of source against a saved reference one after the other
+    for the given time. Frames are pulled from the source only when the
+    previous inspection is done, so with fast pacing this is the maximum
+    inspection rate of the machine.
+    """
+    reference_image = Image.open(
+        paths.SRC_REFERENCE_IMAGES_DIR.joinpath(f"{reference_image_name}.png")
+    ).convert("RGB")
+    coordinates = read_last_reference_image_coordinates(reference_image_name)
+    engine = ComparisonEngine()
+
+    inspections = failed = 0
+    inspection_time = 0.0
+    source.open()
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < seconds:
+            frame = source.grab()
+            if frame is None:
+                if source.exhausted:
+                    break
+                continue
+            inspection_start = time.perf_counter()
+            # Uygulama gibi kare dönüştürülmeden verilir
+            result = engine.compare(
+                reference_image_name,
+                reference_image,
+                Image.fromarray(frame.image),
+                coordinates,
+            )
+            inspection_time += time.perf_counter() - inspection_start
+            inspections += 1
+            failed += not result.passed
+    finally:
+        elapsed = time.monotonic() - start
+        source.close()
+        engine.shutdown()
+    return {
+        **source.describe(),
+        "reference": reference_image_name,
+        "inspections": inspections,
+        "failed_inspections": failed,
+        "elapsed_s": elapsed,
+        "inspections_per_s": inspections / elapsed if elapsed else 0.0,
+        "inspection_mean_ms": (
+            inspection_time / inspections * 1000 if inspections else 0.0
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the frame and inspection throughput of a frame source."
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default=FRAME_SOURCE,
+        help='"pylon", "video:<file>", "images:<directory>" or "synthetic"',
+    )
+    parser.add_argument("--pacing", choices=PACING_MODES, default=PACING_FAST)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--mono", action="store_true", help="Gray frames")
+    parser.add_argument(
+        "--no-loop", action="store_true", help="Stop at the end of the playback"
+    )
+    parser.add_argument("--reference", help="Inspect every frame against a reference")
+    args = parser.parse_args()
+
+    source = create_frame_source(
+        args.source, mono=args.mono, pacing=args.pacing, loop=not args.no_loop
+    )
+    if args.reference:
+        stats = measure_inspection_throughput(source, args.reference, args.seconds)
+    else:
+        stats = measure_grab_throughput(source, args.seconds)
+    print(json.dumps(stats, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,43 @@
+import os
 import tkinter as tk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 
 import cv2 as cv
 import numpy as np
 from PIL import Image, ImageTk
 
-from src.utilities.file_helper import write_last_reference_image_parameters
+from src.utilities.edge_preserving import SMOOTHING_MODES, smooth
+from src.utilities.file_helper import (write_last_reference_image_parameters,
+                                       write_reference_image_smoothing_mode)
+from src.utilities.inspection_runner import InspectionRunner
+from src.utilities.parameter_sweep import sweep_reference
+from src.utilities.reference_cache import (invalidate_reference,
+                                           reference_cache, to_gray)
+
+# Kaydırıcı hareketi bitince bu kadar beklenip önizleme hesaplanır
+ADJUST_DEBOUNCE_MS = int(os.getenv("ADJUST_DEBOUNCE_MS", "120"))
+# Hızlı önizlemenin görüntüye oranı; ardından tam çözünürlük hesaplanır
+ADJUST_PREVIEW_SCALE = float(os.getenv("ADJUST_PREVIEW_SCALE", "0.5"))
+
+VIEW_FILTERED = "filtered"
+VIEW_EDGES = "edges"
+VIEW_CONTOUR = "contour"
+
+
+def scaled_filter_parameters(params: tuple, scale: float) -> tuple:
+    """(d, sigmaColor, sigmaSpace) for an image scaled by scale."""
+    d, sigma_color, sigma_space = params
+    return max(1, round(d * scale)), sigma_color, sigma_space * scale
 
 
 class ImageAdjustWindow:
-    """A window for adjusting image filter parameters."""
+    """
+    A window for adjusting image filter parameters.
+
+    Slider changes are debounced; the filter then runs on a downscaled copy
+    on a worker thread for a quick preview and on the full-resolution image
+    right after. Canny only re-runs on the cached filtered image.
+    """
 
     def __init__(
         self,
@@ -36,13 +64,30 @@ class ImageAdjustWindow:
         self.canvas_image_width = canvas_image.size[0]
         self.canvas_image_height = canvas_image.size[1]
         self.resize_rate = 1.0
-        self.original_image = cv.cvtColor(
-            np.array(canvas_image.copy()), cv.COLOR_RGB2GRAY
-        )  # Store a copy of the original image
-        self.filtered_image = cv.cvtColor(
-            np.array(canvas_image.copy()), cv.COLOR_RGB2GRAY
+        # Store a gray copy of the original image (RGB or Mono8 reference)
+        self.original_image = to_gray(canvas_image).copy()
+        self.preview_image = cv.resize(
+            self.original_image,
+            None,
+            fx=ADJUST_PREVIEW_SCALE,
+            fy=ADJUST_PREVIEW_SCALE,
+            interpolation=cv.INTER_AREA,
         )
+        self.filtered_image = self.original_image.copy()
         self.edge_detected_image = None
+        # Son filtre sonucu ve parametreleri; Canny bunu yeniden kullanır
+        self.filtered_key = None
+        self.filtered_is_preview = False
+        self.view = VIEW_FILTERED
+        # Filtre ve kenar değişiklikleri ayrı bekletilir; biri diğerini iptal etmez
+        self._debounce_jobs = {"filter": None, "edge": None}
+        self._photo = None
+        self._photo_key = None
+        self._image_item = None
+        self.runner = InspectionRunner(self.window)
+        self.sweep_runner = InspectionRunner(self.window)
+        self.sweep_button = None
+        self.sweep_window = None
 
         # Assign filter parameters
         self.d_var = d_var
@@ -50,12 +95,28 @@ class ImageAdjustWindow:
         self.sigma_space_var = sigma_space_var
         self.threshold1_var = threshold1_var
         self.threshold2_var = threshold2_var
+        self.smoothing_mode_var = tk.StringVar(
+            value=reference_cache.smoothing_mode(reference_image_name)
+        )
 
         self.create_canvas()
         self.create_sliders()
         self.create_apply_button()
         self.create_apply_edge_button()
         self.create_apply_contour_button()
+        self.create_sweep_button()
+        # Değişkenler uygulamaya ait; izleyiciler pencere kapanınca kaldırılır
+        self._traces = [
+            (var, var.trace_add("write", callback))
+            for var, callback in (
+                (self.d_var, self.on_filter_change),
+                (self.sigma_color_var, self.on_filter_change),
+                (self.sigma_space_var, self.on_filter_change),
+                (self.smoothing_mode_var, self.on_filter_change),
+                (self.threshold1_var, self.on_edge_change),
+                (self.threshold2_var, self.on_edge_change),
+            )
+        ]
         self.apply_filters()
 
         # Pencereye odaklanma özelliği eklenir
@@ -93,17 +154,27 @@ class ImageAdjustWindow:
         self.update_canvas()
 
     def update_canvas(self):
-        img = self.canvas_image.resize(
-            (
-                int(self.canvas_image_width * self.resize_rate),
-                int(self.canvas_image_height * self.resize_rate),
+        """Show canvas_image, scaled once to the canvas size."""
+        size = (self.canvas_image_width, self.canvas_image_height)
+        image = np.asarray(self.canvas_image)
+        if image.shape[1::-1] != size:
+            interpolation = (
+                cv.INTER_AREA if image.shape[1] > size[0] else cv.INTER_LINEAR
             )
-        )
-        img = ImageTk.PhotoImage(img)
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=img)
-
-        # Keep a reference to the image to prevent it from being garbage collected
-        self.canvas.image = img
+            image = cv.resize(image, size, interpolation=interpolation)
+        image = Image.fromarray(image)
+        key = (image.mode, image.size)
+        if key != self._photo_key:
+            self._photo = ImageTk.PhotoImage(image.mode, image.size)
+            self._photo_key = key
+            if self._image_item is None:
+                self._image_item = self.canvas.create_image(
+                    0, 0, anchor=tk.NW, image=self._photo
+                )
+            else:
+                self.canvas.itemconfig(self._image_item, image=self._photo)
+        # Aynı PhotoImage yerinde güncellenir
+        self._photo.paste(image)
 
     def create_sliders(self):
         """Create sliders for adjusting filter parameters."""
@@ -139,6 +210,18 @@ class ImageAdjustWindow:
                 font="Helvetica, 14",
             ).pack(padx=20, pady=2)
 
+        # Yumuşatma modu: tam bilateral veya hızlı yaklaşımlar
+        tk.Label(
+            self.bilateral_frame, text="Yumuşatma Modu", font="Helvetica, 14"
+        ).pack(padx=20, pady=(10, 2))
+        ttk.Combobox(
+            self.bilateral_frame,
+            textvariable=self.smoothing_mode_var,
+            values=SMOOTHING_MODES,
+            state="readonly",
+            font="Helvetica, 14",
+        ).pack(padx=20, pady=2)
+
         # Canny Edge Detector Parameters
         self.canny_frame = tk.LabelFrame(
             self.window,
@@ -201,50 +284,180 @@ class ImageAdjustWindow:
         )
         apply_contour_button.pack(pady=15)
 
-    def apply_filters(self):
-        """Apply filters to the image."""
+    def create_sweep_button(self):
+        """Create a button for sweeping the filter parameters."""
+
+        self.sweep_button = ttk.Button(
+            self.canny_frame,
+            text="Parametre Taraması",
+            style="Accent.TButton",
+            command=self.start_sweep,
+        )
+        self.sweep_button.pack(pady=15)
+
+    def start_sweep(self):
+        self.sweep_button.config(state="disabled", text="Taranıyor...")
+        self.sweep_runner.submit(
+            lambda cancel: sweep_reference(self.image_name),
+            self.show_sweep,
+            self.show_sweep_error,
+        )
 
-        # Always start with the original image
-        self.canvas_image = self.original_image.copy()
+    def show_sweep_error(self, error: BaseException):
+        self.sweep_button.config(state="normal", text="Parametre Taraması")
+        messagebox.showerror(
+            "Hata", f"Parametre taraması başarısız: {error}", parent=self.window
+        )
 
-        # Apply bilateral filter
-        self.filtered_image = cv.bilateralFilter(
-            self.canvas_image,
+    def show_sweep(self, outcome):
+        """Show the contact sheet; the recommended setting can be applied."""
+        self.sweep_button.config(state="normal", text="Parametre Taraması")
+        results, recommended, sheet = outcome
+        if self.sweep_window is not None:
+            self.sweep_window.destroy()
+        self.sweep_window = tk.Toplevel(self.window)
+        self.sweep_window.title("Parametre Taraması")
+
+        image = Image.fromarray(sheet)
+        image.thumbnail((1000, 700))
+        photo = ImageTk.PhotoImage(image)
+        label = tk.Label(self.sweep_window, image=photo)
+        label.image = photo
+        label.pack(padx=10, pady=10)
+
+        if recommended is None:
+            text = "Örnekleri ayıran ayar bulunamadı."
+        else:
+            text = (
+                f"Önerilen: {recommended.params} - marj {recommended.margin:+.3f}, "
+                f"{recommended.inspection_ms:.1f} ms"
+            )
+        tk.Label(self.sweep_window, text=text, font="Helvetica, 14").pack(pady=5)
+        if recommended is not None:
+            ttk.Button(
+                self.sweep_window,
+                text="Önerileni Uygula",
+                style="Accent.TButton",
+                command=lambda: self.apply_parameters(recommended.params),
+            ).pack(pady=10)
+
+    def apply_parameters(self, params: tuple):
+        variables = (
+            self.d_var,
+            self.sigma_color_var,
+            self.sigma_space_var,
+            self.threshold1_var,
+            self.threshold2_var,
+        )
+        for var, value in zip(variables, params):
+            var.set(value)
+        self.sweep_window.destroy()
+        self.sweep_window = None
+
+    def filter_parameters(self) -> tuple:
+        return (
             self.d_var.get(),
             self.sigma_color_var.get(),
             self.sigma_space_var.get(),
         )
 
-        # Convert back to PIL format
-        self.canvas_image = Image.fromarray(self.filtered_image)
+    def on_filter_change(self, *_):
+        self._debounce("filter", self.apply_filters)
 
-        # Update the canvas
-        self.update_canvas()
+    def on_edge_change(self, *_):
+        # Kontur görünümünde eşik değişikliği konturları günceller
+        self._debounce(
+            "edge",
+            (
+                self.render_edges
+                if self.view == VIEW_CONTOUR
+                else self.apply_edge_detection
+            ),
+        )
 
-    def apply_edge_detection(self):
-        """Apply Canny edge detection to the image."""
+    def _debounce(self, kind: str, command):
+        if self._debounce_jobs[kind] is not None:
+            self.window.after_cancel(self._debounce_jobs[kind])
+        self._debounce_jobs[kind] = self.window.after(ADJUST_DEBOUNCE_MS, command)
 
-        # Always start with the original image
-        self.canvas_image = self.filtered_image.copy()
+    def apply_filters(self):
+        """Filter a downscaled copy first, then the full-resolution image."""
+        self._debounce_jobs["filter"] = None
+        self.view = VIEW_FILTERED
+        try:
+            params = self.filter_parameters()
+        except tk.TclError:
+            # Kaydırıcı düzenlenirken değer geçici olarak geçersiz olabilir
+            return
+        mode = self.smoothing_mode_var.get()
+        preview_params = scaled_filter_parameters(params, ADJUST_PREVIEW_SCALE)
+        self.runner.submit(
+            lambda cancel: smooth(self.preview_image, preview_params, mode),
+            lambda filtered: self.show_filtered(filtered, (params, mode), True),
+        )
 
-        # Apply Canny edge detection
-        self.edge_detected_image = cv.Canny(
-            self.canvas_image, self.threshold1_var.get(), self.threshold2_var.get()
+    def refine_filters(self, key):
+        params, mode = key
+        self.runner.submit(
+            lambda cancel: smooth(self.original_image, params, mode),
+            lambda filtered: self.show_filtered(filtered, key, False),
         )
 
-        # Convert back to PIL format
-        self.canvas_image = Image.fromarray(self.edge_detected_image)
+    def show_filtered(self, filtered, key, is_preview):
+        self.filtered_image = filtered
+        self.filtered_key = key
+        self.filtered_is_preview = is_preview
+        self.edge_detected_image = None
+        self.render_view()
+        if is_preview:
+            self.refine_filters(key)
+
+    def full_filtered_image(self):
+        """Full-resolution filtered image for the current parameters."""
+        key = (self.filter_parameters(), self.smoothing_mode_var.get())
+        if key != self.filtered_key or self.filtered_is_preview:
+            self.runner.cancel()
+            self.filtered_image = smooth(self.original_image, *key)
+            self.filtered_key = key
+            self.filtered_is_preview = False
+            self.edge_detected_image = None
+        return self.filtered_image
 
-        # Update the canvas
-        self.update_canvas()
+    def apply_edge_detection(self):
+        """Apply Canny edge detection to the cached filtered image."""
+        self.view = VIEW_EDGES
+        self.render_edges()
+
+    def render_edges(self):
+        self._debounce_jobs["edge"] = None
+        self.edge_detected_image = None
+        self.render_view()
 
     def apply_contour(self):
-        image_colored = cv.cvtColor(self.filtered_image, cv.COLOR_GRAY2BGR)
-        contours, _ = cv.findContours(
-            self.edge_detected_image, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE
-        )
-        cv.drawContours(image_colored, contours, -1, (0, 255, 0), 2)
-        self.canvas_image = Image.fromarray(image_colored)
+        self.view = VIEW_CONTOUR
+        self.full_filtered_image()
+        self.render_view()
+
+    def render_view(self):
+        if self.view == VIEW_FILTERED:
+            self.canvas_image = Image.fromarray(self.filtered_image)
+            self.update_canvas()
+            return
+        if self.edge_detected_image is None:
+            self.edge_detected_image = cv.Canny(
+                self.filtered_image,
+                self.threshold1_var.get(),
+                self.threshold2_var.get(),
+            )
+        if self.view == VIEW_EDGES:
+            self.canvas_image = Image.fromarray(self.edge_detected_image)
+        else:
+            image_colored = cv.cvtColor(self.filtered_image, cv.COLOR_GRAY2BGR)
+            contours, _ = cv.findContours(
+                self.edge_detected_image, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE
+            )
+            cv.drawContours(image_colored, contours, -1, (0, 255, 0), 2)
+            self.canvas_image = Image.fromarray(image_colored)
         self.update_canvas()
 
     def on_close(self):
@@ -258,4 +471,15 @@ class ImageAdjustWindow:
             self.threshold2_var.get(),
         )
         write_last_reference_image_parameters(self.image_name, values_of_parameters)
+        write_reference_image_smoothing_mode(
+            self.image_name, self.smoothing_mode_var.get()
+        )
+        invalidate_reference(self.image_name)
+        for var, trace_id in self._traces:
+            var.trace_remove("write", trace_id)
+        for job in self._debounce_jobs.values():
+            if job is not None:
+                self.window.after_cancel(job)
+        self.runner.shutdown()
+        self.sweep_runner.shutdown()
         self.window.destroy()
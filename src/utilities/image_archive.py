@@ -0,0 +1,121 @@
+"""
+Asynchronous archiving of captured frames.
+
+Inspections compare the grabbed frame in memory; the copy kept on disk is
+encoded and written by a background thread so that PNG encoding (tens of ms
+for an 800x600 frame) stays off the inspection latency path. Files are
+written to a temporary name and renamed, so a reader never sees a half
+written image. When the queue is full the oldest pending write is dropped.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config import logger
+
+ARCHIVE_QUEUE_SIZE = 8
+
+
+class ImageArchiver:
+    """Writes images to disk on a daemon thread, in submission order."""
+
+    def __init__(self, max_pending: int = ARCHIVE_QUEUE_SIZE):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.write_time = 0.0
+        self._thread: Optional[threading.Thread] = None
+        # Uygulama kapanırken bekleyen kayıtlar yazılır
+        atexit.register(self.flush)
+
+    def submit(self, image: Union[np.ndarray, Image.Image], path, **save_options):
+        """
+        Queue image to be saved at path and return immediately. The image must
+        not be modified afterwards; frames of the ring buffer never are.
+        """
+        self._ensure_started()
+        item = (image, Path(path), save_options)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._queue.task_done()
+                with self._lock:
+                    self.dropped += 1
+                logger.warning(msg=f"Archive queue full, dropped {dropped[1]}")
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="image-archive", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            image, path, save_options = self._queue.get()
+            start = time.perf_counter()
+            try:
+                self._write(image, path, save_options)
+                with self._lock:
+                    self.written += 1
+                    self.write_time += time.perf_counter() - start
+            except (OSError, ValueError) as err:
+                with self._lock:
+                    self.failed += 1
+                logger.error(msg=f"Archiving {path} failed: {err}")
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _write(image, path: Path, save_options: dict):
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        # Yarım yazılmış dosya görülmesin diye geçici adla yazılıp taşınır
+        temporary_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+        image.save(temporary_path, **save_options)
+        os.replace(temporary_path, path)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued image is written; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": self.pending,
+                "write_mean_ms": (
+                    self.write_time / self.written * 1000 if self.written else 0.0
+                ),
+            }
+
+
+image_archiver = ImageArchiver()
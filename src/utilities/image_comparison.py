@@ -1,26 +1,45 @@
-from typing import Tuple
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
 
 import cv2 as cv
 import imagehash
 import numpy as np
 from PIL import Image
-from skimage.metrics import structural_similarity
 
-from src.utilities.file_helper import read_last_reference_image_parameters
+from src.config import logger
+# keypoint_match metriği içe aktarıldığında kayıt olur
+from src.utilities import keypoint_matcher  # noqa: F401
+from src.utilities.edge_preserving import SMOOTHING_BILATERAL, smooth
+from src.utilities.fast_ssim import (SSIM_BACKEND_FAST, SSIM_DOWNSCALE,
+                                     compute_ssim_moments,
+                                     resolve_ssim_backend,
+                                     structural_similarity_score)
+from src.utilities.instrumentation import timed
+from src.utilities.metric_cascade import FAIL, PASS, CascadeStage, run_cascade
+from src.utilities.metric_registry import (MetricContext, decision_rule_for,
+                                           register_metric)
+from src.utilities.reference_cache import (get_reference_features,
+                                           grayscale_histogram,
+                                           reference_cache, to_gray)
+
+SIMILARITY_MODE_FULL = "full"
+SIMILARITY_MODE_CASCADE = "cascade"
+SIMILARITY_MODE = os.getenv("SIMILARITY_MODE", SIMILARITY_MODE_FULL)
 
 
 def euclidean_distance(image1: np.ndarray, image2: np.ndarray) -> float:
-    flatten1 = image1.flatten()
-    flatten2 = image2.flatten()
+    # uint8 çıkarmada taşmayı önlemek için float'a çevir
+    flatten1 = image1.flatten().astype(np.float64)
+    flatten2 = image2.flatten().astype(np.float64)
     distance = np.linalg.norm(flatten1 - flatten2)
     max_distance = np.linalg.norm(
         np.full(flatten1.shape, 255)
     )  # Tüm piksellerin maksimum değerde olduğu durum
     distance_percentage = (distance / max_distance) * 100
-    print(
-        "Euclidean Distance as a percentage of max possible distance: {:.2f}%".format(
-            distance_percentage
-        )
+    logger.debug(
+        msg="Euclidean Distance as a percentage of max possible distance: "
+        f"{distance_percentage:.2f}%"
     )
     return distance_percentage
 
@@ -35,22 +54,22 @@ def histogram_intersection(hist1: np.ndarray, hist2: np.ndarray) -> float:
 
 
 def calculate_histogram_intersection_for_grayscale(
-    images1: np.ndarray, images2: np.ndarray
+    images1: np.ndarray, images2: np.ndarray, hist1: np.ndarray = None
 ) -> float:
     """
     Calculate Histogram Intersection for two grayscale images.
+    A precomputed normalized histogram of the first image can be given as hist1.
     """
-    # Grayscale görüntülerin histogramlarını hesapla
-    hist1 = cv.calcHist([images1], [0], None, [256], [0, 256])
-    hist2 = cv.calcHist([images2], [0], None, [256], [0, 256])
-
-    # Histogramları normalize et
-    cv.normalize(hist1, hist1, alpha=0, beta=1, norm_type=cv.NORM_MINMAX)
-    cv.normalize(hist2, hist2, alpha=0, beta=1, norm_type=cv.NORM_MINMAX)
+    # Grayscale görüntülerin normalize edilmiş histogramlarını hesapla
+    if hist1 is None:
+        hist1 = grayscale_histogram(images1)
+    hist2 = grayscale_histogram(images2)
 
     # Histogramların kesişimini hesapla
     intersection_score = histogram_intersection(hist1, hist2)
-    print("Histogram Intersection for Grayscale Images: ", intersection_score)
+    logger.debug(
+        msg=f"Histogram Intersection for Grayscale Images: {intersection_score}"
+    )
     return intersection_score
 
 
@@ -92,7 +111,7 @@ def bhattacharyya_distance(edges1: np.ndarray, edges2: np.ndarray) -> float:
     bhattacharyya_distance_score = cv.compareHist(
         hist1, hist2, cv.HISTCMP_BHATTACHARYYA
     )
-    print("Bhattacharyya Distance: ", bhattacharyya_distance_score)
+    logger.debug(msg=f"Bhattacharyya Distance: {bhattacharyya_distance_score}")
     return bhattacharyya_distance_score
 
 
@@ -111,97 +130,311 @@ def phash_percentage_difference(image1: np.ndarray, image2: np.ndarray) -> float
     # Maksimum farkı ve yüzdelik farkı hesapla (64 bitlik hash için maksimum fark 64)
     maksimum_fark = 64
     yuzde_fark = (hash_difference / maksimum_fark) * 100
-    print("{:.2f}%".format(yuzde_fark))
+    logger.debug(msg="pHash difference: {:.2f}%".format(yuzde_fark))
     return yuzde_fark
 
 
+@register_metric("ssim", estimated_cost_ms=2.0)
+def _ssim_metric(context: MetricContext) -> float:
+    ssim_backend = resolve_ssim_backend(context.options.get("ssim_backend"))
+    return structural_similarity_score(
+        context.reference.filtered,
+        context.filtered_product,
+        backend=ssim_backend,
+        reference_moments=(
+            reference_ssim_moments(context.reference)
+            if ssim_backend == SSIM_BACKEND_FAST
+            else None
+        ),
+    )
+
+
+@register_metric("histogram_intersection", estimated_cost_ms=0.1)
+def _histogram_intersection_metric(context: MetricContext) -> float:
+    return calculate_histogram_intersection_for_grayscale(
+        context.reference.filtered,
+        context.filtered_product,
+        hist1=context.reference.histogram,
+    )
+
+
+@register_metric("euclidean_distance", higher_is_better=False, estimated_cost_ms=0.5)
+def _euclidean_distance_metric(context: MetricContext) -> float:
+    return euclidean_distance(context.reference.edges, context.product_edges)
+
+
+@register_metric(
+    "bhattacharyya_distance", higher_is_better=False, estimated_cost_ms=0.1
+)
+def _bhattacharyya_distance_metric(context: MetricContext) -> float:
+    return bhattacharyya_distance(context.reference.edges, context.product_edges)
+
+
+@register_metric("phash_difference", higher_is_better=False, estimated_cost_ms=1.0)
+def _phash_difference_metric(context: MetricContext) -> float:
+    hash_difference = context.reference.phash() - imagehash.phash(
+        Image.fromarray(context.filtered_product)
+    )
+    return hash_difference / 64 * 100
+
+
+@register_metric("sift_ratio", estimated_cost_ms=25.0)
+def _sift_ratio_metric(context: MetricContext) -> float:
+    ratio, _ = sift_similarity(context.reference.filtered, context.filtered_product)
+    return ratio
+
+
+def filter_product_image(
+    product_image, params: tuple, smoothing_mode: str = SMOOTHING_BILATERAL
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Apply the smoothing and Canny edge detection of a reference to a product crop.
+    """
+    product_image_gray = to_gray(product_image)
+    filtered_product_image = smooth(product_image_gray, params, smoothing_mode)
+    edge_detected_product_image = cv.Canny(filtered_product_image, params[3], params[4])
+    return filtered_product_image, edge_detected_product_image
+
+
 def filter_images(
-    reference_image_name: str, reference_image, product_image
+    reference_image_name: str, reference_image, product_image, roi: tuple = None
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
     Filter images using parameters from last reference image.
+    The reference side is served from the reference cache when roi is given.
     """
-    reference_image_gray = cv.cvtColor(np.array(reference_image), cv.COLOR_RGB2GRAY)
-    product_image_gray = cv.cvtColor(np.array(product_image), cv.COLOR_RGB2GRAY)
-    params = read_last_reference_image_parameters(reference_image_name)
-    filtered_reference_image = cv.bilateralFilter(
-        reference_image_gray, params[0], params[1], params[2]
+    reference_features = get_reference_features(
+        reference_image_name, reference_image, roi
     )
-    filtered_product_image = cv.bilateralFilter(
-        product_image_gray, params[0], params[1], params[2]
+    filtered_product_image, edge_detected_product_image = filter_product_image(
+        product_image,
+        reference_cache.parameters(reference_image_name),
+        reference_cache.smoothing_mode(reference_image_name),
     )
-    edge_detected_reference_image = cv.Canny(
-        filtered_reference_image, params[3], params[4]
-    )
-    edge_detected_product_image = cv.Canny(filtered_product_image, params[3], params[4])
     return (
-        filtered_reference_image,
+        reference_features.filtered,
         filtered_product_image,
-        edge_detected_reference_image,
+        reference_features.edges,
         edge_detected_product_image,
     )
 
 
+DIFFERENCE_COLOR_BGR = (0, 0, 255)
+
+
+def difference_mask(
+    reference_image_edges: np.ndarray,
+    product_image_edges: np.ndarray,
+    dilation: int = 0,
+) -> np.ndarray:
+    """
+    Build a boolean mask of the pixels where the two edge images differ.
+    """
+    diff = cv.absdiff(reference_image_edges, product_image_edges)
+    if dilation > 0:
+        kernel = cv.getStructuringElement(
+            cv.MORPH_ELLIPSE, (2 * dilation + 1, 2 * dilation + 1)
+        )
+        diff = cv.dilate(diff, kernel)
+    return diff != 0
+
+
+def difference_regions(
+    mask: np.ndarray, min_area: int = 4
+) -> list[Tuple[int, int, int, int]]:
+    """
+    Return (x, y, w, h) boxes around the connected regions of a difference mask.
+    """
+    count, _, stats, _ = cv.connectedComponentsWithStats(
+        mask.astype(np.uint8), connectivity=8
+    )
+    # İlk bileşen arka plan, onu atla
+    return [
+        tuple(int(v) for v in stats[label, :4])
+        for label in range(1, count)
+        if stats[label, cv.CC_STAT_AREA] >= min_area
+    ]
+
+
 def find_the_difference_between_two_images(
     reference_image=None,
     reference_image_edges=None,
     product_image_edges=None,
     euclidean_distance=None,
+    style: str = "paint",
+    dilation: int = 0,
+    alpha: float = 0.5,
+    draw_boxes: bool = False,
+    min_box_area: int = 4,
 ):
-    reference_image_bgr = cv.cvtColor(np.array(reference_image), cv.COLOR_RGB2BGR)
+    """
+    Mark the edge differences on a copy of the image in red.
 
-    # İki edge görüntüsü arasındaki farkı hesaplayın
-    diff = cv.absdiff(reference_image_edges, product_image_edges)
+    The overlay is computed on the whole array at once. ``style`` selects how
+    differing pixels are drawn: ``"paint"`` sets them to red, ``"blend"``
+    alpha-blends red over them. ``dilation`` thickens the mask by that many
+    pixels and ``draw_boxes`` frames every connected difference region.
+    """
+    image = np.array(reference_image)
+    # Mono8 kameradan gelen gri görüntüler de işaretlenebilsin
+    reference_image_bgr = cv.cvtColor(
+        image, cv.COLOR_GRAY2BGR if image.ndim == 2 else cv.COLOR_RGB2BGR
+    )
 
-    h, w = diff.shape
+    mask = difference_mask(reference_image_edges, product_image_edges, dilation)
 
-    for y in range(h):
-        for x in range(w):
-            if diff[y, x] != 0:  # Fark varsa
-                reference_image_bgr[y, x] = [0, 0, 255]
+    if style == "paint":
+        reference_image_bgr[mask] = DIFFERENCE_COLOR_BGR
+    elif style == "blend":
+        color = np.array(DIFFERENCE_COLOR_BGR, dtype=np.float32)
+        blended = reference_image_bgr[mask] * (1.0 - alpha) + color * alpha
+        reference_image_bgr[mask] = blended.astype(np.uint8)
+    else:
+        raise ValueError(f"Unknown difference overlay style: {style}")
+
+    if draw_boxes:
+        for x, y, w, h in difference_regions(mask, min_box_area):
+            cv.rectangle(
+                reference_image_bgr,
+                (x, y),
+                (x + w - 1, y + h - 1),
+                DIFFERENCE_COLOR_BGR,
+                1,
+            )
 
     return reference_image_bgr
 
 
-def calculate_similarity(
+def reference_ssim_moments(reference_features, downscale: float = SSIM_DOWNSCALE):
+    """
+    SSIM moments of a filtered reference crop, kept with its cached features.
+    """
+    return reference_features.get_or_compute(
+        f"ssim_moments:{downscale}",
+        lambda: compute_ssim_moments(reference_features.filtered, downscale=downscale),
+    )
+
+
+@dataclass
+class SimilarityResult:
+    """Outcome of comparing one reference crop with one product crop."""
+
+    passed: bool
+    scores: dict = field(default_factory=dict)
+    diff_image: Optional[np.ndarray] = None
+    timings: dict = field(default_factory=dict)
+    # Karşılaştırmayı sonuçlandıran kademe; tam yolda None
+    cascade_stage: Optional[str] = None
+
+
+def difference_result(
+    product_image, reference_features, edge_detected_product_image, scores: dict
+) -> SimilarityResult:
+    diff_image = find_the_difference_between_two_images(
+        product_image, reference_features.edges, edge_detected_product_image
+    )
+    return SimilarityResult(False, scores, cv.cvtColor(diff_image, cv.COLOR_BGR2RGB))
+
+
+def evaluate_similarity(
     reference_image_name: str,
     sensitivity: float = 1.0,
     reference_image=None,
     product_image=None,
-) -> float:
+    roi: tuple = None,
+    ssim_backend: str = None,
+    mode: str = None,
+    cascade_stages: list[CascadeStage] = None,
+) -> SimilarityResult:
     """
-    Calculate similarity between reference image and product image.
+    Compare a reference crop with a product crop and keep every metric score.
+    roi identifies the reference crop so that its filtered form can be cached.
+    The verdict follows the decision rule of the reference, see
+    src.utilities.metric_registry; ssim_backend selects "skimage" or "fast".
+    mode "cascade" first runs the cheap checks of src.utilities.metric_cascade
+    and only falls back to the full comparison in their ambiguous band.
     """
-    (
-        filtered_reference_image,
-        filtered_product_image,
-        edge_detected_reference_image,
-        edge_detected_product_image,
-    ) = filter_images(reference_image_name, reference_image, product_image)
-
-    score, _ = structural_similarity(
-        filtered_reference_image, filtered_product_image, full=True, channel_axis=1
+    timings = {}
+    with timed(timings, "reference_features"):
+        reference_features = get_reference_features(
+            reference_image_name, reference_image, roi
+        )
+        params = reference_cache.parameters(reference_image_name)
+        smoothing_mode = reference_cache.smoothing_mode(reference_image_name)
+    with timed(timings, "gray"):
+        product_gray = to_gray(product_image)
+
+    cascade_scores = {}
+    if (mode or SIMILARITY_MODE) == SIMILARITY_MODE_CASCADE:
+        with timed(timings, "cascade"):
+            decision, cascade_scores, stage = run_cascade(
+                reference_features, product_gray, cascade_stages
+            )
+        if decision == PASS:
+            return SimilarityResult(
+                True, cascade_scores, timings=timings, cascade_stage=stage
+            )
+        if decision == FAIL:
+            with timed(timings, "filter"):
+                _, edge_detected_product_image = filter_product_image(
+                    product_gray, params, smoothing_mode
+                )
+            with timed(timings, "diff"):
+                result = difference_result(
+                    product_image,
+                    reference_features,
+                    edge_detected_product_image,
+                    cascade_scores,
+                )
+            result.timings = timings
+            result.cascade_stage = stage
+            return result
+
+    with timed(timings, "filter"):
+        filtered_product_image, edge_detected_product_image = filter_product_image(
+            product_gray, params, smoothing_mode
+        )
+    context = MetricContext(
+        reference=reference_features,
+        product_gray=product_gray,
+        filtered_product=filtered_product_image,
+        product_edges=edge_detected_product_image,
+        options={"ssim_backend": ssim_backend},
+    )
+    passed, rule_scores = decision_rule_for(reference_image_name).evaluate(
+        context, timings
     )
-    print("Image similarity", score)
+    scores = dict(cascade_scores, **rule_scores)
+    logger.debug(msg=f"Similarity scores {scores}")
+
+    if passed:
+        return SimilarityResult(True, scores, timings=timings)
+    with timed(timings, "diff"):
+        result = difference_result(
+            product_image, reference_features, edge_detected_product_image, scores
+        )
+    result.timings = timings
+    return result
 
-    # bhattacharyya_distance_score = bhattacharyya_distance(edge_detected_reference_image, edge_detected_product_image)
-    #
-    # euclidean_distance_value = euclidean_distance(edge_detected_reference_image, edge_detected_product_image)
-    #
-    # # sift_ratio, sift_matches = sift_similarity(filtered_reference_image, filtered_product_image)
-    # # print(f"SIFT Matches: {sift_matches}, SIFT Ratio: {sift_ratio}")
-    #
-    # phash=phash_percentage_difference(filtered_reference_image, filtered_product_image)
 
-    histI = calculate_histogram_intersection_for_grayscale(
-        filtered_reference_image, filtered_product_image
+def calculate_similarity(
+    reference_image_name: str,
+    sensitivity: float = 1.0,
+    reference_image=None,
+    product_image=None,
+    roi: tuple = None,
+    mode: str = None,
+) -> Tuple[bool, Optional[np.ndarray]]:
+    """
+    Calculate similarity between reference image and product image.
+    Returns the verdict and, for a failed comparison, the difference image.
+    """
+    result = evaluate_similarity(
+        reference_image_name,
+        sensitivity,
+        reference_image,
+        product_image,
+        roi,
+        mode=mode,
     )
-
-    if histI > 0.80 and score > 0.75:
-        print(True)
-        return True, None
-    else:
-        diff_image = find_the_difference_between_two_images(
-            product_image, edge_detected_reference_image, edge_detected_product_image
-        )
-        return False, cv.cvtColor(diff_image, cv.COLOR_BGR2RGB)
+    return result.passed, result.diff_image
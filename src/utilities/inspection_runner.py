@@ -0,0 +1,199 @@
+"""
+Runs inspections off the Tk main thread.
+
+Capture, filtering, SSIM and diff rendering take tens to hundreds of
+milliseconds; run on the event loop they freeze the window and queue up
+button presses. InspectionRunner executes jobs on a single worker thread and
+hands finished futures back through a thread-safe queue that the Tk thread
+polls with root.after, so callbacks always run on the Tk thread.
+
+Only the newest submission counts: submitting again cancels an inspection
+that has not started yet, asks a running one to stop at its next
+cancel.check(), and discards its result if it finishes anyway.
+"""
+
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from src.config import logger
+from src.utilities.comparison_engine import InspectionResult
+from src.utilities.instrumentation import InspectionTrace
+
+INSPECTION_POLL_MS = int(os.getenv("INSPECTION_POLL_MS", "15"))
+
+
+@dataclass
+class InspectionOutcome:
+    """
+    What an inspection job hands back to the Tk thread. inspection_result is
+    None when the job stopped to switch to the suggested brand first.
+    """
+
+    trace: InspectionTrace
+    product_image: Any
+    inspection_result: Optional[InspectionResult]
+    suggested_brand: Any = None
+
+
+class InspectionCancelled(Exception):
+    """Raised inside a job whose inspection was superseded."""
+
+
+class CancelToken:
+    """Passed to every job; check() raises once the job was superseded."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise InspectionCancelled
+
+
+class InspectionRunner:
+    """
+    Executes job(cancel) on a worker thread and calls on_done(result) or
+    on_error(exception) on the Tk thread. on_busy(bool) is called on the Tk
+    thread when the runner starts and stops working, for an in-progress
+    indicator.
+    """
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        on_busy: Optional[Callable[[bool], None]] = None,
+        poll_interval_ms: int = INSPECTION_POLL_MS,
+    ):
+        self.root = root
+        self.on_busy = on_busy
+        self.poll_interval_ms = poll_interval_ms
+        # Tek işçi: denetimler sırayla çalışır, çekirdekleri ComparisonEngine kullanır
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="inspection"
+        )
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._generation = 0
+        self._future: Optional[Future] = None
+        self._cancel: Optional[CancelToken] = None
+        self._callbacks: Optional[tuple] = None
+        self._poll_job = None
+        self.busy = False
+        self.counters = {"submitted": 0, "completed": 0, "superseded": 0, "failed": 0}
+        self._runs = 0
+        self._run_time = 0.0
+
+    def submit(
+        self,
+        job: Callable[[CancelToken], Any],
+        on_done: Callable[[Any], None],
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        on_superseded: Optional[Callable[[], None]] = None,
+    ) -> int:
+        """
+        Run job on the worker thread, superseding the previous one.
+        on_superseded is called on the Tk thread instead of on_done when this
+        submission is cancelled or superseded before its result is delivered.
+        """
+        self.cancel()
+        self._generation += 1
+        generation = self._generation
+        cancel = CancelToken()
+        future = self._executor.submit(self._run, job, cancel)
+        future.add_done_callback(lambda done: self._results.put((generation, done)))
+        self._future = future
+        self._cancel = cancel
+        self._callbacks = (on_done, on_error, on_superseded)
+        self.counters["submitted"] += 1
+        self._set_busy(True)
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_interval_ms, self._poll)
+        return generation
+
+    def _run(self, job, cancel: CancelToken):
+        start = time.perf_counter()
+        try:
+            return job(cancel)
+        finally:
+            self._runs += 1
+            self._run_time += time.perf_counter() - start
+
+    def cancel(self):
+        """Supersede the current inspection; its result is never delivered."""
+        callbacks = self._callbacks
+        if self._cancel is not None:
+            self._cancel.cancel()
+            # Henüz başlamamışsa hiç çalışmaz
+            self._future.cancel()
+        self._future = None
+        self._cancel = None
+        self._callbacks = None
+        if self.busy:
+            self._set_busy(False)
+        if callbacks is not None and callbacks[2] is not None:
+            callbacks[2]()
+
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                generation, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation or self._callbacks is None:
+                self.counters["superseded"] += 1
+                continue
+            self._deliver(future)
+        if self.busy or self._future is not None:
+            self._poll_job = self.root.after(self.poll_interval_ms, self._poll)
+
+    def _deliver(self, future: Future):
+        on_done, on_error, on_superseded = self._callbacks
+        self._future = None
+        self._cancel = None
+        self._callbacks = None
+        self._set_busy(False)
+        error = future.exception()
+        if isinstance(error, InspectionCancelled):
+            self.counters["superseded"] += 1
+            if on_superseded is not None:
+                on_superseded()
+        elif error is not None:
+            self.counters["failed"] += 1
+            logger.error(msg=f"Inspection failed: {error}", exc_info=error)
+            if on_error is not None:
+                on_error(error)
+        else:
+            self.counters["completed"] += 1
+            on_done(future.result())
+
+    def _set_busy(self, busy: bool):
+        self.busy = busy
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+    def shutdown(self):
+        self.cancel()
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "busy": self.busy,
+            "run_mean_ms": self._run_time / self._runs * 1000 if self._runs else 0.0,
+        }
@@ -0,0 +1,179 @@
+"""
+Per-stage timing of inspections and an opt-in sampling profiler.
+
+Every inspection carries an InspectionTrace with its own ID. Stages are timed
+with time.perf_counter (monotonic) into millisecond totals, and when the
+inspection ends the whole trace is written to the brand_detection logger as
+a single JSON record, so cycle times can be grepped and aggregated from the
+log file.
+
+The SamplingProfiler periodically samples the Python stacks of the running
+threads from a daemon thread and writes collapsed stacks (flame graph input)
+to the logs directory. It is off unless INSPECTION_PROFILER=1 is set or it is
+switched on from the application menu.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from src.config import logger, paths
+
+PROFILER_ENABLED = os.getenv("INSPECTION_PROFILER", "0") == "1"
+PROFILER_INTERVAL = float(os.getenv("INSPECTION_PROFILER_INTERVAL", "0.005"))
+
+
+@contextmanager
+def timed(timings: Optional[dict], name: str):
+    """Add the duration of the block, in ms, to timings[name] (if timings)."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        timings[name] = timings.get(name, 0.0) + elapsed
+
+
+class InspectionTrace:
+    """Stage timings and outcome of one inspection."""
+
+    def __init__(self, reference_image_name: Optional[str] = None, **fields):
+        self.inspection_id = uuid.uuid4().hex[:12]
+        self.reference_image_name = reference_image_name
+        self.started_at = datetime.now()
+        self.stages: dict[str, float] = {}
+        self.fields = fields
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, elapsed_ms: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def merge(self, timings: dict, prefix: str = ""):
+        """Add stage timings (ms) measured elsewhere, e.g. on a worker thread."""
+        for name, elapsed_ms in timings.items():
+            self.add(f"{prefix}{name}", elapsed_ms)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {name: round(ms, 3) for name, ms in self.stages.items()}
+        return {
+            "inspection_id": self.inspection_id,
+            "reference": self.reference_image_name,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "stages": stages,
+            **self.fields,
+        }
+
+    def finish(self, **fields) -> dict:
+        """Log the trace once as a single JSON record and return it."""
+        self.fields.update(fields)
+        record = self.to_dict()
+        if not self._finished:
+            self._finished = True
+            logger.info(msg=f"Inspection trace: {json.dumps(record, default=str)}")
+        return record
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of all other threads every interval seconds.
+    Samples are kept as collapsed stacks ("outer;inner;leaf" -> count).
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        logger.info(msg=f"Sampling profiler started ({self.interval * 1000:.1f} ms)")
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write the collapsed stacks; returns the file path."""
+        if not self.running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        path = self.write_collapsed()
+        logger.info(msg=f"Sampling profiler stopped, {path}: {self.top(10)}")
+        return path
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                        f"{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def top(self, count: int = 20) -> list[tuple[str, int]]:
+        """Leaf frames with the most samples."""
+        leaves = Counter()
+        for stack, samples in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += samples
+        return leaves.most_common(count)
+
+    def write_collapsed(self, path=None) -> str:
+        if path is None:
+            path = paths.SRC_LOGS_DIR.joinpath(
+                f"profile_{datetime.now():%Y%m%d_%H%M%S}.collapsed"
+            )
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, samples in self.samples.most_common():
+                file.write(f"{stack} {samples}\n")
+        return str(path)
+
+    def reset(self):
+        self.samples.clear()
+
+
+profiler = SamplingProfiler()
+if PROFILER_ENABLED:
+    profiler.start()
@@ -0,0 +1,146 @@
+"""
+Keypoint matching metric with cached reference descriptors.
+
+sift_similarity creates a SIFT detector and a brute-force matcher on every
+call and recomputes the reference descriptors each time. Here the keypoints
+and binary descriptors (ORB or AKAZE) of a reference crop are computed once,
+indexed with a FLANN LSH index and stored with the cached reference features.
+Per comparison only the product side is detected; the index returns the two
+nearest reference descriptors for every product descriptor and the ratio test
+runs on the resulting arrays.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+
+from src.utilities.metric_registry import MetricContext, register_metric
+from src.utilities.reference_cache import ReferenceFeatures
+
+DETECTOR_ORB = "orb"
+DETECTOR_AKAZE = "akaze"
+KEYPOINT_DETECTOR = os.getenv("KEYPOINT_DETECTOR", DETECTOR_ORB)
+MAX_KEYPOINTS = int(os.getenv("MAX_KEYPOINTS", "500"))
+RATIO_TEST = 0.8
+
+_FLANN_INDEX_LSH = 6
+_LSH_INDEX_PARAMS = dict(
+    algorithm=_FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1
+)
+
+# OpenCV dedektörleri iş parçacıkları arasında paylaşılmamalı
+_detectors = threading.local()
+
+
+def _detector(name: str):
+    key = f"{name}_detector"
+    detector = getattr(_detectors, key, None)
+    if detector is None:
+        if name == DETECTOR_ORB:
+            detector = cv.ORB_create(nfeatures=MAX_KEYPOINTS)
+        elif name == DETECTOR_AKAZE:
+            detector = cv.AKAZE_create()
+        else:
+            raise ValueError(f"Unknown keypoint detector: {name}")
+        setattr(_detectors, key, detector)
+    return detector
+
+
+def detect_and_compute(
+    image: np.ndarray,
+    detector: str = KEYPOINT_DETECTOR,
+    max_keypoints: int = MAX_KEYPOINTS,
+) -> Optional[np.ndarray]:
+    """
+    Binary descriptors of the max_keypoints strongest keypoints of an image,
+    or None when no keypoint is found.
+    """
+    extractor = _detector(detector)
+    keypoints = extractor.detect(image, None)
+    if not keypoints:
+        return None
+    if len(keypoints) > max_keypoints:
+        keypoints = sorted(keypoints, key=lambda kp: kp.response, reverse=True)
+        keypoints = keypoints[:max_keypoints]
+    _, descriptors = extractor.compute(image, keypoints)
+    return descriptors
+
+
+@dataclass
+class ReferenceKeypoints:
+    """Descriptors of a reference crop and their LSH index."""
+
+    descriptors: Optional[np.ndarray]
+    index: Optional[object]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self.descriptors is None else self.descriptors.nbytes
+
+    def match(
+        self, descriptors: Optional[np.ndarray], ratio: float = RATIO_TEST
+    ) -> tuple[int, int]:
+        """
+        Number of product descriptors passing the ratio test and the number
+        of product descriptors queried.
+        """
+        if self.index is None or descriptors is None:
+            return 0, (0 if descriptors is None else len(descriptors))
+        indices, distances = self.index.knnSearch(descriptors, 2, params={})
+        # LSH komşu bulamadığında -1 döner; ikinci komşu yoksa mesafesi
+        # INT_MAX olduğundan eşleşme oran testini geçer
+        found = indices[:, 0] >= 0
+        good = found & (distances[:, 0] < ratio * distances[:, 1].astype(np.float64))
+        return int(np.count_nonzero(good)), len(descriptors)
+
+
+def build_reference_keypoints(
+    image: np.ndarray,
+    detector: str = KEYPOINT_DETECTOR,
+    max_keypoints: int = MAX_KEYPOINTS,
+) -> ReferenceKeypoints:
+    descriptors = detect_and_compute(image, detector, max_keypoints)
+    # İkili komşu araması için en az iki tanımlayıcı gerekir
+    if descriptors is None or len(descriptors) < 2:
+        return ReferenceKeypoints(descriptors, None)
+    return ReferenceKeypoints(
+        descriptors, cv.flann.Index(descriptors, _LSH_INDEX_PARAMS)
+    )
+
+
+def reference_keypoints(
+    features: ReferenceFeatures,
+    detector: str = KEYPOINT_DETECTOR,
+    max_keypoints: int = MAX_KEYPOINTS,
+) -> ReferenceKeypoints:
+    return features.get_or_compute(
+        f"keypoints:{detector}:{max_keypoints}",
+        lambda: build_reference_keypoints(features.filtered, detector, max_keypoints),
+    )
+
+
+def keypoint_match_ratio(
+    features: ReferenceFeatures,
+    product_image: np.ndarray,
+    detector: str = KEYPOINT_DETECTOR,
+    max_keypoints: int = MAX_KEYPOINTS,
+    ratio: float = RATIO_TEST,
+) -> float:
+    """Share of product keypoints with a distinctive match in the reference."""
+    good, total = reference_keypoints(features, detector, max_keypoints).match(
+        detect_and_compute(product_image, detector, max_keypoints), ratio
+    )
+    return good / total if total else 0.0
+
+
+@register_metric("keypoint_match", estimated_cost_ms=3.0)
+def _keypoint_match_metric(context: MetricContext) -> float:
+    return keypoint_match_ratio(
+        context.reference,
+        context.filtered_product,
+        detector=context.options.get("keypoint_detector", KEYPOINT_DETECTOR),
+    )
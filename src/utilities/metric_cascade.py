@@ -0,0 +1,164 @@
+"""
+Early-exit metric cascade for area comparisons.
+
+Cheap checks run on the unfiltered gray crops before the bilateral filter and
+SSIM. Each stage either settles the comparison (a clear pass or a clear fail)
+or hands it to the next stage; only comparisons left in the ambiguous band
+pay for the full filter + SSIM path. Per-stage hit rates are collected in
+cascade_stats so the ordering and bands can be tuned for throughput.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import cv2 as cv
+import imagehash
+import numpy as np
+from PIL import Image
+
+from src.utilities.reference_cache import (ReferenceFeatures,
+                                           grayscale_histogram)
+
+PASS = "pass"
+FAIL = "fail"
+
+THUMBNAIL_SIZE = (32, 32)
+
+
+@dataclass
+class CascadeStage:
+    """
+    A cheap metric with the bands in which it settles a comparison.
+    pass_at/fail_at are inclusive; None disables that side of the stage.
+    """
+
+    name: str
+    pass_at: Optional[float] = None
+    fail_at: Optional[float] = None
+    higher_is_better: bool = True
+
+    def decide(self, value: float) -> Optional[str]:
+        if self.higher_is_better:
+            if self.fail_at is not None and value <= self.fail_at:
+                return FAIL
+            if self.pass_at is not None and value >= self.pass_at:
+                return PASS
+        else:
+            if self.fail_at is not None and value >= self.fail_at:
+                return FAIL
+            if self.pass_at is not None and value <= self.pass_at:
+                return PASS
+        return None
+
+
+def _histogram_intersection(
+    features: ReferenceFeatures, product_gray: np.ndarray
+) -> float:
+    reference_histogram = features.get_or_compute(
+        "gray_histogram", lambda: grayscale_histogram(features.gray)
+    )
+    product_histogram = grayscale_histogram(product_gray)
+    return float(
+        np.minimum(reference_histogram, product_histogram).sum()
+        / product_histogram.sum()
+    )
+
+
+def _phash_distance(features: ReferenceFeatures, product_gray: np.ndarray) -> float:
+    reference_hash = features.get_or_compute(
+        "gray_phash", lambda: imagehash.phash(Image.fromarray(features.gray))
+    )
+    return float(reference_hash - imagehash.phash(Image.fromarray(product_gray)))
+
+
+def _thumbnail(image: np.ndarray) -> np.ndarray:
+    return cv.resize(image, THUMBNAIL_SIZE, interpolation=cv.INTER_AREA)
+
+
+def _thumbnail_mean_abs_diff(
+    features: ReferenceFeatures, product_gray: np.ndarray
+) -> float:
+    reference_thumbnail = features.get_or_compute(
+        "gray_thumbnail", lambda: _thumbnail(features.gray)
+    )
+    return float(cv.absdiff(reference_thumbnail, _thumbnail(product_gray)).mean())
+
+
+STAGE_METRICS: dict[str, Callable[[ReferenceFeatures, np.ndarray], float]] = {
+    "histogram": _histogram_intersection,
+    "phash": _phash_distance,
+    "thumbnail_mad": _thumbnail_mean_abs_diff,
+}
+
+# Bantlar bilerek geniş tutuldu; cascade_stats ile hat üzerinde daraltılmalı
+DEFAULT_CASCADE = [
+    CascadeStage("histogram", pass_at=None, fail_at=0.35),
+    CascadeStage("thumbnail_mad", pass_at=1.0, fail_at=60.0, higher_is_better=False),
+    CascadeStage("phash", pass_at=2, fail_at=28, higher_is_better=False),
+]
+
+
+class CascadeStats:
+    """Thread-safe per-stage counters of a cascade."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, dict[str, int]] = {}
+        self.fallthrough = 0
+
+    def record(self, stage: str, decision: Optional[str]):
+        with self._lock:
+            counts = self._counts.setdefault(stage, {"evaluated": 0, PASS: 0, FAIL: 0})
+            counts["evaluated"] += 1
+            if decision is not None:
+                counts[decision] += 1
+
+    def record_fallthrough(self):
+        with self._lock:
+            self.fallthrough += 1
+
+    def snapshot(self) -> dict:
+        """Counts and hit rates of every stage, plus the SSIM fallthrough count."""
+        with self._lock:
+            stages = {}
+            for stage, counts in self._counts.items():
+                evaluated = counts["evaluated"]
+                stages[stage] = dict(
+                    counts,
+                    hit_rate=(
+                        (counts[PASS] + counts[FAIL]) / evaluated if evaluated else 0.0
+                    ),
+                )
+            return {"stages": stages, "fallthrough": self.fallthrough}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self.fallthrough = 0
+
+
+cascade_stats = CascadeStats()
+
+
+def run_cascade(
+    features: ReferenceFeatures,
+    product_gray: np.ndarray,
+    stages: Optional[list[CascadeStage]] = None,
+    stats: CascadeStats = cascade_stats,
+) -> tuple[Optional[str], dict, Optional[str]]:
+    """
+    Run the cheap stages in order until one settles the comparison.
+    Returns the decision (PASS, FAIL or None), the stage values and the name of
+    the deciding stage.
+    """
+    scores = {}
+    for stage in DEFAULT_CASCADE if stages is None else stages:
+        value = STAGE_METRICS[stage.name](features, product_gray)
+        scores[stage.name] = value
+        decision = stage.decide(value)
+        stats.record(stage.name, decision)
+        if decision is not None:
+            return decision, scores, stage.name
+    stats.record_fallthrough()
+    return None, scores, None
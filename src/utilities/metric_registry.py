@@ -0,0 +1,222 @@
+"""
+Registry of similarity metrics and per-reference decision rules.
+
+Metrics are named plugins that declare whether higher values mean more
+similar, whether they need colour and an estimated cost, and record their
+measured wall time on every call. A decision rule lists which metrics a
+reference uses, with a threshold and a weight for each; a comparison passes
+when the weighted share of passing metrics reaches the rule's required score.
+Rules are stored as JSON next to the reference parameters, so per-brand
+decisions change without code edits.
+"""
+
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from src.utilities.file_helper import (read_reference_image_decision_rule,
+                                       reference_image_decision_rule_path)
+from src.utilities.instrumentation import timed
+from src.utilities.reference_cache import ReferenceFeatures
+
+
+@dataclass
+class MetricContext:
+    """Inputs a metric plugin may use for one area comparison."""
+
+    reference: ReferenceFeatures
+    product_gray: np.ndarray
+    filtered_product: np.ndarray
+    product_edges: np.ndarray
+    options: dict = field(default_factory=dict)
+
+
+@dataclass
+class MetricPlugin:
+    """A named metric with its declared cost and measured timings."""
+
+    name: str
+    func: Callable[[MetricContext], float]
+    higher_is_better: bool = True
+    estimated_cost_ms: float = 1.0
+    uses_color: bool = False
+    calls: int = 0
+    total_time: float = 0.0
+    last_time: float = 0.0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def __call__(self, context: MetricContext) -> float:
+        start = time.perf_counter()
+        value = float(self.func(context))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+        return value
+
+    @property
+    def mean_ms(self) -> float:
+        """Measured mean cost, or the estimate before the first call."""
+        if not self.calls:
+            return self.estimated_cost_ms
+        return self.total_time / self.calls * 1000
+
+    def passes(self, value: float, threshold: float) -> bool:
+        return value > threshold if self.higher_is_better else value < threshold
+
+
+_metrics: dict[str, MetricPlugin] = {}
+
+
+def register_metric(
+    name: str,
+    higher_is_better: bool = True,
+    estimated_cost_ms: float = 1.0,
+    uses_color: bool = False,
+):
+    """
+    Decorator registering a function of MetricContext as a metric plugin.
+    Metrics that need the colour channels of the crops set uses_color.
+    """
+
+    def decorator(func: Callable[[MetricContext], float]):
+        _metrics[name] = MetricPlugin(
+            name=name,
+            func=func,
+            higher_is_better=higher_is_better,
+            estimated_cost_ms=estimated_cost_ms,
+            uses_color=uses_color,
+        )
+        return func
+
+    return decorator
+
+
+def get_metric(name: str) -> MetricPlugin:
+    try:
+        return _metrics[name]
+    except KeyError:
+        raise ValueError(f"Unknown similarity metric: {name}") from None
+
+
+def registered_metrics() -> dict[str, MetricPlugin]:
+    return dict(_metrics)
+
+
+def metric_timings() -> dict[str, dict]:
+    """Estimated and measured cost of every registered metric."""
+    return {
+        name: {
+            "estimated_cost_ms": plugin.estimated_cost_ms,
+            "mean_ms": plugin.mean_ms,
+            "calls": plugin.calls,
+        }
+        for name, plugin in _metrics.items()
+    }
+
+
+@dataclass
+class MetricRule:
+    name: str
+    threshold: float
+    weight: float = 1.0
+
+
+@dataclass
+class DecisionRule:
+    """
+    Metrics a reference is judged by. With the default required_score of 1.0
+    every metric has to pass.
+    """
+
+    metrics: list[MetricRule]
+    required_score: float = 1.0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DecisionRule":
+        return cls(
+            metrics=[MetricRule(**metric) for metric in data["metrics"]],
+            required_score=data.get("required_score", 1.0),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def estimated_cost_ms(self) -> float:
+        """Cost of the rule from the measured (or estimated) metric costs."""
+        return sum(get_metric(metric.name).mean_ms for metric in self.metrics)
+
+    def uses_color(self) -> bool:
+        return any(get_metric(metric.name).uses_color for metric in self.metrics)
+
+    def evaluate(
+        self, context: MetricContext, timings: Optional[dict] = None
+    ) -> tuple[bool, dict]:
+        """
+        Verdict and score of every metric. When a timings dict is given, the
+        time of each metric is added to it in ms as "metric.<name>".
+        """
+        scores = {}
+        total_weight = 0.0
+        passed_weight = 0.0
+        for metric in self.metrics:
+            plugin = get_metric(metric.name)
+            with timed(timings, f"metric.{metric.name}"):
+                value = plugin(context)
+            scores[metric.name] = value
+            total_weight += metric.weight
+            if plugin.passes(value, metric.threshold):
+                passed_weight += metric.weight
+        passed = total_weight > 0 and passed_weight / total_weight >= (
+            self.required_score
+        )
+        return passed, scores
+
+
+# Önceki sabit karar: histI > 0.80 and score > 0.75
+DEFAULT_DECISION_RULE = DecisionRule(
+    metrics=[
+        MetricRule("ssim", 0.75),
+        MetricRule("histogram_intersection", 0.80),
+    ]
+)
+
+
+_decision_rules: dict[str, tuple[float, DecisionRule]] = {}
+
+
+def decision_rule_for(reference_image_name: Optional[str]) -> DecisionRule:
+    """
+    Decision rule saved for a reference, or the default rule. The rule file is
+    only re-read when its modification time changes.
+    """
+    if reference_image_name is None:
+        return DEFAULT_DECISION_RULE
+    try:
+        mtime = reference_image_decision_rule_path(reference_image_name).stat().st_mtime
+    except FileNotFoundError:
+        return DEFAULT_DECISION_RULE
+
+    cached = _decision_rules.get(reference_image_name)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    data = read_reference_image_decision_rule(reference_image_name)
+    rule = DEFAULT_DECISION_RULE if data is None else DecisionRule.from_dict(data)
+    _decision_rules[reference_image_name] = (mtime, rule)
+    return rule
+
+
+def grayscale_only(reference_image_names: Iterable[str]) -> bool:
+    """
+    Whether none of the references is judged by a colour metric, so that the
+    camera can be grabbed in Mono8.
+    """
+    return not any(
+        decision_rule_for(name).uses_color() for name in reference_image_names
+    )
@@ -0,0 +1,456 @@
+"""
+Multi-camera stations: one worker process per camera, one verdict per part.
+
+A station has several cameras looking at the same part (e.g. front and back
+label). Every camera runs in its own process with its own frame source,
+VideoStreamHandler and InspectionPipeline, so cameras add throughput instead
+of sharing one interpreter lock. A single trigger in the main process
+announces each part to all cameras; their verdicts are combined per part and
+the part passes only when every camera passed it in time.
+
+The station is described in src/assets/cameras.json:
+
+    {
+        "cameras": {"front": "pylon:0815-0000", "back": "pylon:0815-0001"},
+        "reference_sets": {
+            "coffe": {"front": "coffe", "back": "coffe_back"}
+        },
+        "trigger": "timer:60"
+    }
+
+A reference set maps every camera to the saved reference it inspects
+against. Attached cameras and their serial numbers are listed with
+
+    python -m src.utilities.multi_camera --list
+    python -m src.utilities.multi_camera --set coffe --seconds 60
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import cv2 as cv
+
+from src.config import logger, paths
+from src.utilities.comparison_engine import ComparisonEngine
+from src.utilities.file_helper import read_cameras_config
+from src.utilities.frame_sources import create_frame_source, list_cameras
+from src.utilities.image_archive import image_archiver
+from src.utilities.inspection_pipeline import (THROUGHPUT_WINDOW,
+                                               InspectionPipeline,
+                                               ManualTrigger, Part, Trigger,
+                                               create_trigger)
+from src.utilities.video_stream_handler import VideoStreamHandler
+
+PART_TIMEOUT = 5.0
+
+
+@dataclass
+class CameraVerdict:
+    """Verdict of one camera for one part, sent from its worker process."""
+
+    camera: str
+    part_key: str
+    passed: Optional[bool]
+    failed_rois: list = field(default_factory=list)
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+
+
+@dataclass
+class PartVerdict:
+    """Combined verdict of all cameras for one part."""
+
+    part_number: int
+    label: Optional[str]
+    triggered_at: float
+    cameras: dict = field(default_factory=dict)
+    missing: list = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return (
+            not self.missing
+            and bool(self.cameras)
+            and all(verdict.passed for verdict in self.cameras.values())
+        )
+
+
+def camera_worker(
+    camera: str,
+    source_spec: str,
+    reference_image_name: str,
+    commands,
+    results,
+    threads: int,
+):
+    """
+    Worker process of one camera. Parts arrive as ("part", (key, triggered_at))
+    commands and every finished part is sent back as a CameraVerdict. The
+    station's time.monotonic() is valid here too (the clock is system-wide), so
+    latency_ms covers the IPC hop as well.
+    """
+    cv.setNumThreads(threads)
+    handler = None
+    pipeline = None
+    try:
+        handler = VideoStreamHandler(source=create_frame_source(source_spec))
+        archive_path = paths.SRC_PRODUCT_IMAGES_DIR.joinpath(
+            f"{camera}_product_image.png"
+        )
+
+        def publish(part: Part):
+            if part.frame is not None:
+                image_archiver.submit(part.frame.image, archive_path, compress_level=1)
+            results.put(
+                (
+                    "verdict",
+                    CameraVerdict(
+                        camera=camera,
+                        part_key=part.label,
+                        passed=None if part.result is None else part.result.passed,
+                        failed_rois=(
+                            []
+                            if part.result is None
+                            else [r.index for r in part.result.failed_rois]
+                        ),
+                        error=part.error,
+                        latency_ms=(time.monotonic() - part.triggered_at) * 1000,
+                    ),
+                )
+            )
+
+        pipeline = InspectionPipeline(
+            handler,
+            reference_image_name,
+            engine=ComparisonEngine(max_workers=threads),
+            trigger=ManualTrigger(),
+            publishers=[publish],
+        )
+        pipeline.start()
+        results.put(("ready", camera, handler.source.describe()))
+        while True:
+            command, argument = commands.get()
+            if command == "part":
+                key, triggered_at = argument
+                pipeline.trigger.fire(key, triggered_at)
+            elif command == "reference":
+                pipeline.set_reference(argument)
+            elif command == "stop":
+                break
+    except Exception as err:
+        logger.error(msg=f"Camera {camera} worker failed: {err}", exc_info=True)
+        results.put(("error", camera, f"{type(err).__name__}: {err}"))
+    finally:
+        stats = {}
+        if pipeline is not None:
+            pipeline.stop()
+            stats["pipeline"] = pipeline.stats()
+        if handler is not None:
+            handler.release()
+            stats["grab"] = handler.stats()
+        image_archiver.flush(timeout=5.0)
+        results.put(("stats", camera, stats))
+
+
+class MultiCameraStation:
+    """
+    Starts a worker process per camera, fans every trigger out to all of
+    them and combines their verdicts per part. publishers are called with
+    each PartVerdict on the collector thread.
+    """
+
+    def __init__(
+        self,
+        cameras: dict[str, str],
+        reference_sets: dict[str, dict[str, str]],
+        reference_set: str,
+        trigger: Optional[Trigger] = None,
+        publishers: Optional[list[Callable[[PartVerdict], None]]] = None,
+        part_timeout: float = PART_TIMEOUT,
+    ):
+        if not cameras:
+            raise ValueError("A station needs at least one camera")
+        for name, mapping in reference_sets.items():
+            missing = set(cameras) - set(mapping)
+            if missing:
+                raise ValueError(
+                    f"Reference set {name} has no reference for: {sorted(missing)}"
+                )
+        self.cameras = cameras
+        self.reference_sets = reference_sets
+        self.reference_set = reference_set
+        self.trigger = trigger or ManualTrigger()
+        self.publishers = list(publishers or [])
+        self.part_timeout = part_timeout
+
+        # pylon ve iş parçacıklarıyla fork güvenli değil; süreçler spawn ile açılır
+        self._context = multiprocessing.get_context("spawn")
+        self._commands = {}
+        self._processes = {}
+        self._results = None
+        self._collector = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._pending: dict[str, PartVerdict] = {}
+        self._part_number = 0
+        self._completions: deque = deque()
+        self._started_at = None
+        self.counters = {"triggered": 0, "passed": 0, "failed": 0, "incomplete": 0}
+        self.camera_info = {}
+        self.camera_stats = {}
+        self.camera_errors = {}
+
+    @classmethod
+    def from_config(
+        cls, config: dict, reference_set: Optional[str] = None, **kwargs
+    ) -> "MultiCameraStation":
+        reference_sets = config["reference_sets"]
+        reference_set = reference_set or next(iter(reference_sets))
+        if "trigger" in config and "trigger" not in kwargs:
+            kwargs["trigger"] = create_trigger(config["trigger"])
+        return cls(config["cameras"], reference_sets, reference_set, **kwargs)
+
+    def start(self, ready_timeout: float = 30.0):
+        if self.reference_set not in self.reference_sets:
+            raise ValueError(f"Unknown reference set: {self.reference_set}")
+        self._stop.clear()
+        self._results = self._context.Queue()
+        threads = max(1, (os.cpu_count() or 1) // len(self.cameras))
+        references = self.reference_sets[self.reference_set]
+        for camera, source_spec in self.cameras.items():
+            commands = self._context.Queue()
+            process = self._context.Process(
+                target=camera_worker,
+                args=(
+                    camera,
+                    source_spec,
+                    references[camera],
+                    commands,
+                    self._results,
+                    threads,
+                ),
+                name=f"camera-{camera}",
+                daemon=True,
+            )
+            process.start()
+            self._commands[camera] = commands
+            self._processes[camera] = process
+        self._wait_until_ready(ready_timeout)
+
+        self._started_at = time.monotonic()
+        self._collector = threading.Thread(
+            target=self._collect, name="station-collector", daemon=True
+        )
+        self._collector.start()
+        self.trigger.start(self.on_trigger)
+        logger.info(
+            msg=f"Station started with {len(self.cameras)} cameras, "
+            f"reference set {self.reference_set}: {self.camera_info}"
+        )
+
+    def _wait_until_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while len(self.camera_info) + len(self.camera_errors) < len(self.cameras):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = self._results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            self._handle(message)
+        not_ready = set(self.cameras) - set(self.camera_info)
+        if not_ready:
+            self.stop()
+            raise RuntimeError(
+                f"Cameras not ready: {sorted(not_ready)} {self.camera_errors}"
+            )
+
+    def on_trigger(
+        self, label: Optional[str] = None, triggered_at: Optional[float] = None
+    ):
+        """Announce a part to every camera, stamped with the station's trigger time."""
+        if triggered_at is None:
+            triggered_at = time.monotonic()
+        with self._lock:
+            self._part_number += 1
+            self.counters["triggered"] += 1
+            part = PartVerdict(self._part_number, label, triggered_at)
+            key = str(part.part_number)
+            self._pending[key] = part
+        for commands in self._commands.values():
+            commands.put(("part", (key, triggered_at)))
+
+    def set_reference_set(self, reference_set: str):
+        """Inspect the following parts against another reference set."""
+        references = self.reference_sets[reference_set]
+        self.reference_set = reference_set
+        for camera, commands in self._commands.items():
+            commands.put(("reference", references[camera]))
+
+    def _collect(self):
+        while not self._stop.is_set():
+            try:
+                message = self._results.get(timeout=0.1)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                self._handle(message)
+            self._expire()
+
+    def _handle(self, message: tuple):
+        kind = message[0]
+        if kind == "ready":
+            self.camera_info[message[1]] = message[2]
+        elif kind == "error":
+            self.camera_errors[message[1]] = message[2]
+            logger.error(msg=f"Camera {message[1]}: {message[2]}")
+        elif kind == "stats":
+            self.camera_stats[message[1]] = message[2]
+        elif kind == "verdict":
+            verdict: CameraVerdict = message[1]
+            with self._lock:
+                part = self._pending.get(verdict.part_key)
+                if part is None:
+                    # Zaman aşımından sonra gelen karar
+                    return
+                part.cameras[verdict.camera] = verdict
+                complete = len(part.cameras) == len(self.cameras)
+                if complete:
+                    del self._pending[verdict.part_key]
+            if complete:
+                self._finish(part)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key
+                for key, part in self._pending.items()
+                if now - part.triggered_at > self.part_timeout
+            ]
+            parts = [self._pending.pop(key) for key in expired]
+        for part in parts:
+            part.missing = sorted(set(self.cameras) - set(part.cameras))
+            self._finish(part)
+
+    def _finish(self, part: PartVerdict):
+        with self._lock:
+            if part.missing:
+                self.counters["incomplete"] += 1
+            self.counters["passed" if part.passed else "failed"] += 1
+            self._completions.append(time.monotonic())
+        logger.info(
+            msg=f"Part {part.part_number} "
+            f"{'passed' if part.passed else 'failed'}: "
+            + json.dumps(
+                {
+                    "label": part.label,
+                    "missing": part.missing,
+                    "cameras": {
+                        name: {
+                            "passed": verdict.passed,
+                            "failed_rois": verdict.failed_rois,
+                            "error": verdict.error,
+                            "latency_ms": round(verdict.latency_ms, 3),
+                        }
+                        for name, verdict in part.cameras.items()
+                    },
+                }
+            )
+        )
+        for publish in self.publishers:
+            try:
+                publish(part)
+            except Exception as err:
+                logger.error(msg=f"Publishing part verdict failed: {err}")
+
+    def stop(self, timeout: float = 10.0):
+        self.trigger.stop()
+        for commands in self._commands.values():
+            commands.put(("stop", None))
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+        self._stop.set()
+        if self._collector is not None:
+            self._collector.join()
+            self._collector = None
+        # Son istatistik mesajları toplanır
+        while True:
+            try:
+                self._handle(self._results.get(timeout=0.5))
+            except queue.Empty:
+                break
+        for camera, process in self._processes.items():
+            if process.is_alive():
+                logger.warning(msg=f"Camera {camera} worker did not stop")
+                process.terminate()
+        self._commands = {}
+        self._processes = {}
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            while self._completions and now - self._completions[0] > THROUGHPUT_WINDOW:
+                self._completions.popleft()
+            window = min(THROUGHPUT_WINDOW, now - (self._started_at or now))
+            return {
+                **self.counters,
+                "pending": len(self._pending),
+                "achieved_ppm": (
+                    len(self._completions) / window * 60 if window > 0 else 0.0
+                ),
+                "reference_set": self.reference_set,
+                "cameras": {
+                    camera: self.camera_stats.get(camera, self.camera_info.get(camera))
+                    for camera in self.cameras
+                },
+                "errors": self.camera_errors,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a multi-camera station, one worker process per camera."
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the attached cameras and exit"
+    )
+    parser.add_argument("--config", help="Station config (src/assets/cameras.json)")
+    parser.add_argument("--set", dest="reference_set", help="Reference set to use")
+    parser.add_argument("--trigger", help="Trigger spec overriding the config")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if args.list:
+        print(json.dumps(list_cameras(), indent=2))
+        return
+    config = read_cameras_config(
+        paths.SRC_CAMERAS_CONFIG_FILE if args.config is None else Path(args.config)
+    )
+    if config is None:
+        parser.error("station config not found")
+    kwargs = {"trigger": create_trigger(args.trigger)} if args.trigger else {}
+    station = MultiCameraStation.from_config(config, args.reference_set, **kwargs)
+    station.start()
+    try:
+        time.sleep(args.seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        station.stop()
+    print(json.dumps(station.stats(), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+Parameter sweep for the five filter values of a reference.
+
+The (d, sigmaColor, sigmaSpace, threshold1, threshold2) values saved by
+ImageAdjustWindow decide how well a reference separates good from defective
+products and how long every inspection takes. A sweep evaluates a grid of
+settings on the areas of a reference across a process pool; the values are
+shared by all areas, so all of them are evaluated unless one is picked. For
+every setting the labelled good and bad samples are judged with the
+reference's decision rule, which gives
+
+- accuracy: share of samples whose verdict matches their label,
+- margin: distance between the worst good and the best bad score of every
+  rule metric (positive when the metric separates them), worst over the
+  areas, and
+- inspection_ms: filter + metric time of comparing all swept areas.
+
+Samples are read from src/assets/sweep_samples/<reference>/good and /bad
+(product images with the reference's geometry). Without both good and bad
+samples there is nothing to separate and the sweep refuses to run;
+synthesized variants are judged by the reference's own rule and never
+separate on the real references. The results are drawn as a thumbnail
+contact sheet:
+
+    python -m src.utilities.parameter_sweep coffe [--roi 1] [--workers 4]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product as cartesian_product
+from pathlib import Path
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+from src.config import paths
+from src.utilities.edge_preserving import SMOOTHING_BILATERAL
+from src.utilities.file_helper import read_last_reference_image_coordinates
+from src.utilities.image_comparison import filter_product_image
+from src.utilities.metric_registry import (DecisionRule, MetricContext,
+                                           decision_rule_for, get_metric)
+from src.utilities.reference_cache import (build_reference_features,
+                                           reference_cache, to_gray)
+
+D_VALUES = (5, 9, 15)
+SIGMA_COLOR_VALUES = (25.0, 75.0, 150.0)
+SIGMA_SPACE_VALUES = (25.0, 75.0)
+THRESHOLD_VALUES = ((50, 150), (100, 200))
+
+THUMBNAIL_WIDTH = 160
+
+
+@dataclass
+class SweepResult:
+    """Score of one filter setting on the labelled samples."""
+
+    params: tuple
+    accuracy: float
+    margin: float
+    margins: dict = field(default_factory=dict)
+    inspection_ms: float = 0.0
+    thumbnail: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @property
+    def separates(self) -> bool:
+        return self.accuracy == 1.0 and self.margin > 0
+
+    def to_dict(self) -> dict:
+        return {
+            "params": list(self.params),
+            "accuracy": self.accuracy,
+            "margin": self.margin,
+            "margins": self.margins,
+            "inspection_ms": self.inspection_ms,
+            "separates": self.separates,
+        }
+
+
+def parameter_grid(
+    d_values=D_VALUES,
+    sigma_color_values=SIGMA_COLOR_VALUES,
+    sigma_space_values=SIGMA_SPACE_VALUES,
+    threshold_values=THRESHOLD_VALUES,
+) -> list[tuple]:
+    """Every (d, sigmaColor, sigmaSpace, threshold1, threshold2) combination."""
+    return [
+        (d, sigma_color, sigma_space, threshold1, threshold2)
+        for d, sigma_color, sigma_space, (threshold1, threshold2) in (
+            cartesian_product(
+                d_values, sigma_color_values, sigma_space_values, threshold_values
+            )
+        )
+    ]
+
+
+def load_samples(samples_dir: Path, roi: tuple) -> list:
+    """(area, is_good) pairs cut from the images in samples_dir/good and /bad."""
+    x1, y1, x2, y2 = roi
+    samples = []
+    for label, is_good in (("good", True), ("bad", False)):
+        for image_path in sorted(samples_dir.joinpath(label).glob("*.png")):
+            image = np.array(Image.open(image_path).convert("RGB"))
+            samples.append((image[y1:y2, x1:x2], is_good))
+    return samples
+
+
+def thumbnail(filtered: np.ndarray, edges: np.ndarray, width: int) -> np.ndarray:
+    """The filtered area with its Canny edges in green, scaled to width."""
+    image = cv.cvtColor(filtered, cv.COLOR_GRAY2RGB)
+    image[edges > 0] = (0, 255, 0)
+    height = max(1, round(image.shape[0] * width / image.shape[1]))
+    return cv.resize(image, (width, height), interpolation=cv.INTER_AREA)
+
+
+def _area_scores(
+    params: tuple,
+    reference_roi: np.ndarray,
+    samples: list,
+    rule: DecisionRule,
+    smoothing_mode: str,
+    thumbnail_width: int,
+) -> tuple:
+    """Correct verdicts, metric margins, time and thumbnail of one area."""
+    reference = build_reference_features(reference_roi, params, smoothing_mode)
+    correct = 0
+    scores = {metric.name: {True: [], False: []} for metric in rule.metrics}
+    elapsed = 0.0
+    for sample, is_good in samples:
+        start = time.perf_counter()
+        product_gray = to_gray(sample)
+        filtered, edges = filter_product_image(product_gray, params, smoothing_mode)
+        passed, sample_scores = rule.evaluate(
+            MetricContext(reference, product_gray, filtered, edges)
+        )
+        elapsed += time.perf_counter() - start
+        correct += passed == is_good
+        for name, value in sample_scores.items():
+            scores[name][is_good].append(value)
+
+    margins = {}
+    for name, values in scores.items():
+        good, bad = values[True], values[False]
+        if not good or not bad:
+            continue
+        if get_metric(name).higher_is_better:
+            margins[name] = min(good) - max(bad)
+        else:
+            margins[name] = min(bad) - max(good)
+    return (
+        correct,
+        margins,
+        elapsed / len(samples) if samples else 0.0,
+        thumbnail(reference.filtered, reference.edges, thumbnail_width),
+    )
+
+
+def evaluate_setting(
+    params: tuple,
+    areas: list,
+    rule: DecisionRule,
+    smoothing_mode: str = SMOOTHING_BILATERAL,
+    thumbnail_width: int = THUMBNAIL_WIDTH,
+) -> SweepResult:
+    """
+    Score params on areas, (reference area, samples) pairs. The setting is
+    used for every area of the reference, so the margins are the worst over
+    the areas and inspection_ms is the cost of all of them.
+    """
+    correct = 0
+    sample_count = 0
+    margins = {}
+    elapsed = 0.0
+    thumbnails = []
+    for reference_roi, samples in areas:
+        area_correct, area_margins, area_elapsed, area_thumbnail = _area_scores(
+            params, reference_roi, samples, rule, smoothing_mode, thumbnail_width
+        )
+        correct += area_correct
+        sample_count += len(samples)
+        for name, margin in area_margins.items():
+            margins[name] = min(margin, margins.get(name, margin))
+        elapsed += area_elapsed
+        thumbnails.append(area_thumbnail)
+    return SweepResult(
+        params=tuple(params),
+        accuracy=correct / sample_count if sample_count else 0.0,
+        # Kural ancak en zayıf metrik ayırdığı sürece ayırır
+        margin=min(margins.values()) if margins else 0.0,
+        margins=margins,
+        inspection_ms=elapsed * 1000,
+        thumbnail=np.vstack(thumbnails),
+    )
+
+
+_worker_arguments: dict = {}
+
+
+def _initialize_worker(arguments: dict):
+    # Her süreç tek iş parçacığıyla çalışır; paralellik süreç havuzundan gelir
+    cv.setNumThreads(1)
+    _worker_arguments.update(arguments)
+
+
+def _evaluate_in_worker(params: tuple) -> SweepResult:
+    return evaluate_setting(params, **_worker_arguments)
+
+
+def sweep(
+    areas: list,
+    grid: Optional[list[tuple]] = None,
+    rule: Optional[DecisionRule] = None,
+    smoothing_mode: str = SMOOTHING_BILATERAL,
+    workers: Optional[int] = None,
+) -> list[SweepResult]:
+    """
+    Score every setting of grid (default: parameter_grid()) on areas, a list
+    of (reference area, samples) pairs, in parallel.
+    """
+    grid = parameter_grid() if grid is None else grid
+    arguments = {
+        "areas": areas,
+        "rule": rule or decision_rule_for(None),
+        "smoothing_mode": smoothing_mode,
+    }
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [evaluate_setting(params, **arguments) for params in grid]
+    # Tk ve kamera iş parçacıkları olan süreçten fork güvenli değil
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialize_worker,
+        initargs=(arguments,),
+    ) as executor:
+        return list(
+            executor.map(
+                _evaluate_in_worker,
+                grid,
+                chunksize=max(1, len(grid) // (workers * 4)),
+            )
+        )
+
+
+def recommend(
+    results: list[SweepResult], min_margin: float = 0.0
+) -> Optional[SweepResult]:
+    """The fastest setting that separates good from bad by min_margin."""
+    candidates = [
+        result for result in results if result.separates and result.margin >= min_margin
+    ]
+    return min(candidates, key=lambda result: result.inspection_ms, default=None)
+
+
+def contact_sheet(
+    results: list[SweepResult],
+    recommended: Optional[SweepResult] = None,
+    columns: int = 6,
+) -> np.ndarray:
+    """
+    RGB grid of the thumbnails with their settings and scores. Separating
+    settings are framed green, the others red, the recommended one yellow.
+    """
+    cell_width = max(result.thumbnail.shape[1] for result in results)
+    image_height = max(result.thumbnail.shape[0] for result in results)
+    caption_height = 34
+    cell_height = image_height + caption_height
+    rows = -(-len(results) // columns)
+    sheet = np.full(
+        (rows * (cell_height + 6) + 6, columns * (cell_width + 6) + 6, 3),
+        32,
+        dtype=np.uint8,
+    )
+    for index, result in enumerate(results):
+        row, column = divmod(index, columns)
+        x = 6 + column * (cell_width + 6)
+        y = 6 + row * (cell_height + 6)
+        height, width = result.thumbnail.shape[:2]
+        sheet[y : y + height, x : x + width] = result.thumbnail
+        if result is recommended:
+            color = (255, 220, 0)
+        elif result.separates:
+            color = (0, 200, 0)
+        else:
+            color = (220, 40, 40)
+        cv.rectangle(
+            sheet, (x - 3, y - 3), (x + cell_width + 2, y + cell_height + 2), color, 2
+        )
+        d, sigma_color, sigma_space, threshold1, threshold2 = result.params
+        lines = (
+            f"d{d} c{sigma_color:g} s{sigma_space:g} t{threshold1}/{threshold2}",
+            f"m{result.margin:+.3f} {result.inspection_ms:.1f}ms "
+            f"{result.accuracy:.0%}",
+        )
+        for line_index, line in enumerate(lines):
+            cv.putText(
+                sheet,
+                line,
+                (x + 2, y + image_height + 14 + line_index * 15),
+                cv.FONT_HERSHEY_SIMPLEX,
+                0.38,
+                (230, 230, 230),
+                1,
+                cv.LINE_AA,
+            )
+    return sheet
+
+
+def sweep_reference(
+    reference_image_name: str,
+    roi_index: Optional[int] = None,
+    samples_dir: Optional[Path] = None,
+    grid: Optional[list[tuple]] = None,
+    workers: Optional[int] = None,
+) -> tuple[list[SweepResult], Optional[SweepResult], np.ndarray]:
+    """
+    Sweep every area of a saved reference, or only area roi_index (1-based).
+    Returns the results, the recommended setting and the contact sheet.
+    """
+    reference_image = np.array(
+        Image.open(
+            paths.SRC_REFERENCE_IMAGES_DIR.joinpath(f"{reference_image_name}.png")
+        ).convert("RGB")
+    )
+    rois = read_last_reference_image_coordinates(reference_image_name)
+    if roi_index is not None:
+        rois = [rois[roi_index - 1]]
+
+    samples_dir = samples_dir or paths.SRC_SWEEP_SAMPLES_DIR.joinpath(
+        reference_image_name
+    )
+    areas = []
+    for roi in rois:
+        samples = load_samples(samples_dir, roi) if samples_dir.exists() else []
+        if not any(is_good for _, is_good in samples) or all(
+            is_good for _, is_good in samples
+        ):
+            raise ValueError(
+                f"Sweeping needs good and bad product images in {samples_dir}/good "
+                f"and {samples_dir}/bad"
+            )
+        x1, y1, x2, y2 = roi
+        areas.append((reference_image[y1:y2, x1:x2], samples))
+
+    results = sweep(
+        areas,
+        grid,
+        rule=decision_rule_for(reference_image_name),
+        smoothing_mode=reference_cache.smoothing_mode(reference_image_name),
+        workers=workers,
+    )
+    recommended = recommend(results)
+    return results, recommended, contact_sheet(results, recommended)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep the filter parameters of a reference."
+    )
+    parser.add_argument("reference", help="Reference name")
+    parser.add_argument(
+        "--roi", type=int, help="Only this area number (1-based); default all areas"
+    )
+    parser.add_argument("--samples", type=Path, help="Directory with good/ and bad/")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", type=Path, help="Contact sheet PNG")
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        results, recommended, sheet = sweep_reference(
+            args.reference, args.roi, args.samples, workers=args.workers
+        )
+    except ValueError as err:
+        parser.error(str(err))
+    elapsed = time.perf_counter() - start
+
+    output = args.output or paths.SRC_PARAMETER_SWEEPS_DIR.joinpath(
+        f"{args.reference}.png"
+        if args.roi is None
+        else f"{args.reference}_roi{args.roi}.png"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(sheet).save(output)
+
+    for result in sorted(results, key=lambda r: (not r.separates, r.inspection_ms)):
+        if args.json:
+            print(json.dumps(result.to_dict()))
+        else:
+            metric_margins = "  ".join(
+                f"{name} {margin:+.3f}" for name, margin in result.margins.items()
+            )
+            print(
+                "{params!s:<32} doğruluk {accuracy:4.0%}  marj {margin:+7.3f}  "
+                "{inspection_ms:6.2f} ms".format(**result.to_dict())
+                + f"  ({metric_margins})"
+            )
+    print(
+        f"{len(results)} ayar {elapsed:.1f} s içinde tarandı; "
+        f"önerilen: {recommended.params if recommended else 'yok'}; "
+        f"kontakt baskı: {output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Perceptual hash index of the saved reference images.
+
+Every reference listed in reference_images_names.txt is reduced to a 64-bit
+DCT hash of the whole frame and one per saved area, packed into uint64
+arrays. A product frame is hashed the same way and compared against all
+references at once: XOR of the packed codes, popcount through a byte lookup
+table. Past BK_TREE_MIN_SIZE references, queries with a small radius go
+through a BK-tree instead of the linear scan. The best matches are used to
+suggest, or select, the brand of the product in front of the camera.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+from src.config import logger, paths
+from src.utilities.file_helper import (read_last_reference_image_coordinates,
+                                       read_saved_reference_images_names)
+from src.utilities.reference_cache import to_gray
+
+HASH_SIZE = 8
+HASH_IMAGE_SIZE = 32
+# Doğrusal tarama 5000 referansta ~0.3 ms; BK-ağacı yalnızca büyük kütüphanede
+# ve küçük yarıçapta ondan hızlı
+BK_TREE_MIN_SIZE = 50000
+BK_TREE_MAX_RADIUS = 6
+# Alan hash'lerinin ortalama mesafesi bunun altındaysa marka otomatik seçilir
+AUTO_SELECT_MAX_DISTANCE = 10
+
+# Bir bayttaki 1 bitlerinin sayısı
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_BIT_WEIGHTS = np.uint64(1) << np.arange(63, -1, -1, dtype=np.uint64)
+
+
+def phash_code(image) -> np.uint64:
+    """
+    64-bit perceptual hash of an image: low-frequency 8x8 DCT block of a
+    32x32 thumbnail thresholded at its median, packed MSB first.
+    """
+    gray = to_gray(image)
+    # Büyük görüntülerde INTER_AREA yavaş; önce 4 katına doğrusal küçültülür
+    if min(gray.shape) > 4 * HASH_IMAGE_SIZE:
+        gray = cv.resize(
+            gray,
+            (4 * HASH_IMAGE_SIZE, 4 * HASH_IMAGE_SIZE),
+            interpolation=cv.INTER_LINEAR,
+        )
+    thumbnail = cv.resize(
+        gray, (HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), interpolation=cv.INTER_AREA
+    )
+    low_frequencies = cv.dct(thumbnail.astype(np.float32))[:HASH_SIZE, :HASH_SIZE]
+    bits = (low_frequencies > np.median(low_frequencies)).ravel()
+    return np.uint64(_BIT_WEIGHTS[bits].sum())
+
+
+def hamming_distances(codes: np.ndarray, code) -> np.ndarray:
+    """Hamming distance of one packed code to every code of a uint64 array."""
+    differing = np.bitwise_xor(codes, np.uint64(code))
+    return (
+        _POPCOUNT_TABLE[differing.view(np.uint8)]
+        .reshape(-1, 8)
+        .sum(axis=1, dtype=np.uint8)
+    )
+
+
+def hamming_distance(code1, code2) -> int:
+    return (int(code1) ^ int(code2)).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree of packed hashes for radius queries."""
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def add(self, code, item):
+        node = [int(code), item, {}]
+        self._size += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming_distance(code, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, code, radius: int) -> list[tuple[int, object]]:
+        """(distance, item) pairs within radius of code, nearest first."""
+        if self._root is None:
+            return []
+        code = int(code)
+        results = []
+        candidates = [self._root]
+        while candidates:
+            node_code, item, children = candidates.pop()
+            distance = hamming_distance(code, node_code)
+            if distance <= radius:
+                results.append((distance, item))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    candidates.append(child)
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def __len__(self):
+        return self._size
+
+
+@dataclass
+class HashMatch:
+    """A reference matching a product frame and its hash distances."""
+
+    name: str
+    distance: int
+    roi_distance: Optional[float] = None
+
+    @property
+    def score(self) -> float:
+        """Distance used for ranking; the area hashes decide when available."""
+        return self.distance if self.roi_distance is None else self.roi_distance
+
+
+@dataclass
+class _IndexedReference:
+    name: str
+    code: np.uint64
+    rois: list[tuple] = field(default_factory=list)
+    roi_codes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.uint64))
+
+
+class ReferenceHashIndex:
+    """Packed pHash index of the whole frames and areas of saved references."""
+
+    def __init__(self, bk_tree_min_size: int = BK_TREE_MIN_SIZE):
+        self.bk_tree_min_size = bk_tree_min_size
+        self._references: dict[str, _IndexedReference] = {}
+        self._names: list[str] = []
+        self._codes = np.empty(0, dtype=np.uint64)
+        self._bk_tree: Optional[BKTree] = None
+        self._built = False
+        self._stale: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _index_reference(self, name: str) -> Optional[_IndexedReference]:
+        image_path = paths.SRC_REFERENCE_IMAGES_DIR.joinpath(f"{name}.png")
+        if not image_path.exists():
+            return None
+        gray = to_gray(Image.open(image_path).convert("RGB"))
+        try:
+            rois = [
+                roi
+                for roi in read_last_reference_image_coordinates(name)
+                if len(roi) == 4 and roi[2] - roi[0] >= 8 and roi[3] - roi[1] >= 8
+            ]
+        except (OSError, ValueError):
+            rois = []
+        return _IndexedReference(
+            name=name,
+            code=phash_code(gray),
+            rois=rois,
+            roi_codes=np.array(
+                [phash_code(gray[y1:y2, x1:x2]) for x1, y1, x2, y2 in rois],
+                dtype=np.uint64,
+            ),
+        )
+
+    def _pack(self):
+        self._names = list(self._references)
+        self._codes = np.array(
+            [self._references[name].code for name in self._names], dtype=np.uint64
+        )
+        self._bk_tree = None
+        if len(self._names) >= self.bk_tree_min_size:
+            self._bk_tree = BKTree()
+            for name, code in zip(self._names, self._codes):
+                self._bk_tree.add(code, name)
+
+    def build(self, reference_image_names: Optional[list[str]] = None):
+        """(Re)hash every reference, by default those of reference_images_names.txt."""
+        start = time.perf_counter()
+        if reference_image_names is None:
+            reference_image_names = read_saved_reference_images_names()
+        references = {}
+        for name in reference_image_names:
+            reference = self._index_reference(name)
+            if reference is not None:
+                references[name] = reference
+        with self._lock:
+            self._references = references
+            self._stale.clear()
+            self._pack()
+            self._built = True
+        logger.info(
+            msg=f"pHash index built for {len(references)} references in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def invalidate(self, reference_image_name: Optional[str] = None):
+        """Re-hash one reference (new image or areas), or everything, on next use."""
+        with self._lock:
+            if reference_image_name is None:
+                self._built = False
+            else:
+                self._stale.add(reference_image_name)
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+            return
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        if not stale:
+            return
+        updated = {name: self._index_reference(name) for name in stale}
+        with self._lock:
+            for name, reference in updated.items():
+                if reference is None:
+                    self._references.pop(name, None)
+                else:
+                    self._references[name] = reference
+            self._pack()
+
+    def __len__(self):
+        return len(self._references)
+
+    def nearest(
+        self, product_image, k: int = 3, max_distance: Optional[int] = None
+    ) -> list[HashMatch]:
+        """
+        References nearest to a product frame by whole-frame hash distance.
+        With a small max_distance and a large index the BK-tree answers the
+        query.
+        """
+        self._ensure_built()
+        code = phash_code(product_image)
+        with self._lock:
+            names, codes, bk_tree = self._names, self._codes, self._bk_tree
+        if not names:
+            return []
+        if (
+            bk_tree is not None
+            and max_distance is not None
+            and max_distance <= BK_TREE_MAX_RADIUS
+        ):
+            return [
+                HashMatch(name, distance)
+                for distance, name in bk_tree.search(code, max_distance)[:k]
+            ]
+        distances = hamming_distances(codes, code)
+        k = min(k, len(names))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [
+            HashMatch(names[i], int(distances[i]))
+            for i in nearest
+            if max_distance is None or distances[i] <= max_distance
+        ]
+
+    def identify(
+        self, product_image, k: int = 3, max_distance: Optional[int] = None
+    ) -> list[HashMatch]:
+        """
+        Rank the nearest references by the mean hash distance of their areas
+        cropped from the product frame, falling back to the whole frame hash.
+        """
+        gray = to_gray(product_image)
+        matches = self.nearest(gray, k, max_distance)
+        for match in matches:
+            reference = self._references.get(match.name)
+            if reference is None or not reference.rois:
+                continue
+            product_codes = []
+            for x1, y1, x2, y2 in reference.rois:
+                crop = gray[y1:y2, x1:x2]
+                if crop.shape[0] < 8 or crop.shape[1] < 8:
+                    break
+                product_codes.append(phash_code(crop))
+            else:
+                distances = [
+                    hamming_distance(reference_code, product_code)
+                    for reference_code, product_code in zip(
+                        reference.roi_codes, product_codes
+                    )
+                ]
+                match.roi_distance = float(np.mean(distances))
+        matches.sort(key=lambda match: match.score)
+        return matches
+
+
+reference_index = ReferenceHashIndex()
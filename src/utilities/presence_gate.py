@@ -0,0 +1,160 @@
+"""
+Presence and stability gate for continuous inspection.
+
+Most frames of a running line show an empty conveyor or a part that is still
+moving. The gate looks at a heavily downsampled gray copy of every frame
+(1/8 of the size by default, 100x75 for the inspection window) and measures
+
+- occupancy: the share of pixels that differ from the learned background of
+  the empty conveyor, and
+- motion: the share of pixels that changed since the previous frame.
+
+A part is present when the occupancy reaches presence_threshold; it fires
+exactly once, after it has stayed still for stable_frames frames, and the
+gate re-arms only after the conveyor was empty again for rearm_frames
+frames. The background has to be set from a capture of the empty conveyor
+(set_background): a first frame taken as background could show a part and
+would invert the gate for good. It then follows slow lighting changes with a
+running average on empty frames. Until it is set the gate never fires.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+
+GATE_NO_BACKGROUND = "no_background"
+GATE_EMPTY = "empty"
+GATE_MOVING = "moving"
+GATE_SETTLING = "settling"
+GATE_FIRE = "fire"
+GATE_HOLDING = "holding"
+
+
+@dataclass
+class GateDecision:
+    """Gate state of one frame; fire is True once per part."""
+
+    state: str
+    occupancy: float
+    motion: float
+    stable_frames: int
+
+    @property
+    def fire(self) -> bool:
+        return self.state == GATE_FIRE
+
+
+class PresenceGate:
+    """Decides per frame whether a present, stable part should be inspected."""
+
+    def __init__(
+        self,
+        downscale: int = 8,
+        diff_threshold: int = 25,
+        presence_threshold: float = 0.05,
+        motion_threshold: float = 0.005,
+        stable_frames: int = 3,
+        rearm_frames: int = 2,
+        learn_rate: float = 0.05,
+    ):
+        self.downscale = downscale
+        self.diff_threshold = diff_threshold
+        self.presence_threshold = presence_threshold
+        self.motion_threshold = motion_threshold
+        self.stable_frames = stable_frames
+        self.rearm_frames = rearm_frames
+        self.learn_rate = learn_rate
+        self.reset()
+
+    def reset(self):
+        self._background: Optional[np.ndarray] = None
+        self._previous: Optional[np.ndarray] = None
+        self._stable = 0
+        self._empty = 0
+        self._fired = False
+        self.frames = 0
+        self.fired = 0
+        self.total_time = 0.0
+
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (max(1, width // self.downscale), max(1, height // self.downscale))
+        # Önce küçültülür, sonra griye çevrilir: dönüşüm 64 kat daha az pikselde
+        small = cv.resize(frame, size, interpolation=cv.INTER_AREA)
+        if small.ndim == 3:
+            small = cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+        return small
+
+    def _changed_share(self, image1: np.ndarray, image2: np.ndarray) -> float:
+        changed = cv.absdiff(image1, image2) > self.diff_threshold
+        return np.count_nonzero(changed) / changed.size
+
+    @property
+    def has_background(self) -> bool:
+        return self._background is not None
+
+    def set_background(self, frame: np.ndarray):
+        """Use frame, a view of the empty conveyor, as the background."""
+        self._background = self._small_gray(frame).astype(np.float32)
+        self._stable = 0
+        self._empty = 0
+        self._fired = False
+
+    def update(self, frame: np.ndarray) -> GateDecision:
+        start = time.perf_counter()
+        small = self._small_gray(frame)
+        if self._background is None:
+            # Boş bant görüntüsü verilmeden karar verilmez
+            self._previous = small
+            self.frames += 1
+            self.total_time += time.perf_counter() - start
+            return GateDecision(GATE_NO_BACKGROUND, 0.0, 0.0, 0)
+
+        background = cv.convertScaleAbs(self._background)
+        occupancy = self._changed_share(small, background)
+        motion = (
+            0.0
+            if self._previous is None
+            else self._changed_share(small, self._previous)
+        )
+        self._previous = small
+
+        if occupancy < self.presence_threshold:
+            state = GATE_EMPTY
+            self._stable = 0
+            self._empty += 1
+            if self._empty >= self.rearm_frames:
+                self._fired = False
+            cv.accumulateWeighted(small, self._background, self.learn_rate)
+        else:
+            self._empty = 0
+            if motion > self.motion_threshold:
+                state = GATE_MOVING
+                self._stable = 0
+            else:
+                self._stable += 1
+                if self._fired:
+                    state = GATE_HOLDING
+                elif self._stable >= self.stable_frames:
+                    state = GATE_FIRE
+                    self._fired = True
+                    self.fired += 1
+                else:
+                    state = GATE_SETTLING
+
+        self.frames += 1
+        self.total_time += time.perf_counter() - start
+        return GateDecision(state, occupancy, motion, self._stable)
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "fired": self.fired,
+            "frames_per_part": self.frames / self.fired if self.fired else None,
+            "gate_mean_ms": (
+                self.total_time / self.frames * 1000 if self.frames else 0.0
+            ),
+        }
@@ -0,0 +1,168 @@
+"""
+Live camera preview on a Tkinter canvas.
+
+The preview keeps a single canvas image item and a single PhotoImage and
+pastes every new frame into it, so neither canvas items nor Tk images pile up
+while the camera is open. Frames are downscaled to the canvas with INTER_AREA
+before the PIL/Tk conversion, frames that were already shown are skipped, and
+the display rate is capped at PREVIEW_FPS independently of the grab rate. The
+measured display rate and render cost are drawn in the corner of the canvas
+(PREVIEW_OVERLAY=0 hides them).
+"""
+
+import os
+import time
+import tkinter as tk
+from collections import deque
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+from PIL import Image, ImageTk
+
+from src.config import logger
+from src.utilities.video_stream_handler import VideoStreamHandler
+
+PREVIEW_FPS = float(os.getenv("PREVIEW_FPS", "25"))
+PREVIEW_OVERLAY = os.getenv("PREVIEW_OVERLAY", "1") not in ("0", "false", "no")
+
+
+class PreviewRenderer:
+    """Shows the newest frame of handler on one canvas at a time."""
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        handler: VideoStreamHandler,
+        max_fps: float = PREVIEW_FPS,
+        overlay: bool = PREVIEW_OVERLAY,
+    ):
+        self.root = root
+        self.handler = handler
+        self.max_fps = max_fps
+        self.overlay = overlay
+        self.canvas: Optional[tk.Canvas] = None
+        self._job = None
+        self._photo: Optional[ImageTk.PhotoImage] = None
+        self._photo_key = None
+        self._image_item = None
+        self._text_item = None
+        self._last_frame_number = None
+        self._shown_at: deque = deque(maxlen=30)
+        self._render_times: deque = deque(maxlen=30)
+        self.rendered = 0
+        self.duplicates = 0
+        self.render_time = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.canvas is not None
+
+    def start(self, canvas: tk.Canvas):
+        """Start previewing on canvas; a preview on another canvas is stopped."""
+        self.stop()
+        self.canvas = canvas
+        self._last_frame_number = None
+        self._shown_at.clear()
+        self._render_times.clear()
+        self.rendered = 0
+        self.duplicates = 0
+        self.render_time = 0.0
+        self._tick()
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        if self.canvas is not None:
+            for item in (self._image_item, self._text_item):
+                if item is not None:
+                    self.canvas.delete(item)
+            logger.info(msg=f"Preview stopped: {self.stats()}")
+        self.canvas = None
+        self._image_item = None
+        self._text_item = None
+        self._photo = None
+        self._photo_key = None
+
+    def _tick(self):
+        self._job = None
+        if self.canvas is None:
+            return
+        started = time.perf_counter()
+        frame = self.handler.latest_frame()
+        if frame is not None:
+            if frame.frame_number == self._last_frame_number:
+                self.duplicates += 1
+            else:
+                self._last_frame_number = frame.frame_number
+                self._render(frame.image)
+                elapsed = time.perf_counter() - started
+                self.rendered += 1
+                self.render_time += elapsed
+                self._render_times.append(elapsed)
+                self._shown_at.append(time.monotonic())
+                if self.overlay:
+                    self._draw_overlay()
+        # Kalan süre kadar beklenir; grab hızından bağımsız olarak FPS sınırlanır
+        remaining = 1 / self.max_fps - (time.perf_counter() - started)
+        self._job = self.root.after(max(1, round(remaining * 1000)), self._tick)
+
+    def _fit(self, image: np.ndarray) -> np.ndarray:
+        height, width = image.shape[:2]
+        canvas_width = int(self.canvas["width"])
+        canvas_height = int(self.canvas["height"])
+        scale = min(canvas_width / width, canvas_height / height)
+        if scale >= 1:
+            return image
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv.resize(image, size, interpolation=cv.INTER_AREA)
+
+    def _render(self, image: np.ndarray):
+        image = Image.fromarray(self._fit(image))
+        key = (image.mode, image.size)
+        if key != self._photo_key:
+            # Boyut ya da renk modu değişince tek seferlik yeni PhotoImage
+            self._photo = ImageTk.PhotoImage(image.mode, image.size)
+            self._photo_key = key
+            if self._image_item is None:
+                self._image_item = self.canvas.create_image(
+                    0, 0, anchor="nw", image=self._photo
+                )
+            else:
+                self.canvas.itemconfig(self._image_item, image=self._photo)
+        self._photo.paste(image)
+
+    def _draw_overlay(self):
+        text = f"{self.fps:.1f} fps | {self.render_ms:.1f} ms"
+        if self._text_item is None:
+            self._text_item = self.canvas.create_text(
+                8, 8, anchor="nw", fill="#00FF00", font=("TkFixedFont", 10)
+            )
+        self.canvas.itemconfig(self._text_item, text=text)
+        self.canvas.tag_raise(self._text_item)
+
+    @property
+    def fps(self) -> float:
+        """Display rate over the last 30 shown frames."""
+        if len(self._shown_at) < 2:
+            return 0.0
+        return (len(self._shown_at) - 1) / (self._shown_at[-1] - self._shown_at[0])
+
+    @property
+    def render_ms(self) -> float:
+        """Mean render cost of the last 30 shown frames."""
+        if not self._render_times:
+            return 0.0
+        return sum(self._render_times) / len(self._render_times) * 1000
+
+    def stats(self) -> dict:
+        return {
+            "rendered": self.rendered,
+            "duplicates": self.duplicates,
+            "fps": self.fps,
+            "max_fps": self.max_fps,
+            "render_mean_ms": (
+                self.render_time / self.rendered * 1000 if self.rendered else 0.0
+            ),
+        }
@@ -0,0 +1,244 @@
+"""
+Cache of the artifacts derived from reference image crops.
+
+The reference crop of a brand does not change between inspected products, so
+its gray conversion, smoothed output, Canny edges and histogram are computed
+once and kept in a memory-bounded LRU cache. Entries are keyed by reference
+name, ROI, filter parameters, smoothing mode and the modification time of the
+files they were built from, and are dropped explicitly whenever new
+parameters or areas are saved for a reference.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import cv2 as cv
+import imagehash
+import numpy as np
+from PIL import Image
+
+from src.config import paths
+from src.utilities.edge_preserving import SMOOTHING_BILATERAL, smooth
+from src.utilities.file_helper import (read_last_reference_image_parameters,
+                                       read_reference_image_smoothing_mode,
+                                       reference_image_smoothing_mode_path)
+
+
+def to_gray(image) -> np.ndarray:
+    """Convert a PIL image or RGB array to a single channel gray array."""
+    array = np.asarray(image)
+    if array.ndim == 2:
+        return array
+    return cv.cvtColor(array, cv.COLOR_RGB2GRAY)
+
+
+def grayscale_histogram(image: np.ndarray) -> np.ndarray:
+    """Min-max normalized 256 bin histogram of a gray image."""
+    hist = cv.calcHist([image], [0], None, [256], [0, 256])
+    cv.normalize(hist, hist, alpha=0, beta=1, norm_type=cv.NORM_MINMAX)
+    return hist
+
+
+def _mtime(path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def parameters_file_path(reference_image_name: str):
+    return paths.SRC_PARAMETERS_OF_REFERENCE_IMAGES.joinpath(
+        "".join([reference_image_name, ".txt"])
+    )
+
+
+def reference_source_mtime(reference_image_name: str) -> float:
+    """Latest modification time of the files a reference entry depends on."""
+    return max(
+        _mtime(parameters_file_path(reference_image_name)),
+        _mtime(
+            paths.SRC_REFERENCE_IMAGES_DIR.joinpath(
+                "".join([reference_image_name, ".png"])
+            )
+        ),
+    )
+
+
+@dataclass
+class ReferenceFeatures:
+    """Derived artifacts of one reference crop."""
+
+    gray: np.ndarray
+    filtered: np.ndarray
+    edges: np.ndarray
+    histogram: np.ndarray
+    extras: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    @property
+    def nbytes(self) -> int:
+        size = (
+            self.gray.nbytes
+            + self.filtered.nbytes
+            + self.edges.nbytes
+            + self.histogram.nbytes
+        )
+        for value in self.extras.values():
+            size += getattr(value, "nbytes", 0)
+        return size
+
+    def get_or_compute(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        Return an optional artifact (SSIM moments, pHash, keypoints...),
+        computing and storing it on first use.
+        """
+        with self._lock:
+            if key not in self.extras:
+                self.extras[key] = factory()
+            return self.extras[key]
+
+    def phash(self) -> imagehash.ImageHash:
+        return self.get_or_compute(
+            "phash", lambda: imagehash.phash(Image.fromarray(self.filtered))
+        )
+
+
+def build_reference_features(
+    reference_image, params: tuple, smoothing_mode: str = SMOOTHING_BILATERAL
+) -> ReferenceFeatures:
+    gray = to_gray(reference_image)
+    filtered = smooth(gray, params, smoothing_mode)
+    edges = cv.Canny(filtered, params[3], params[4])
+    return ReferenceFeatures(
+        gray=gray,
+        filtered=filtered,
+        edges=edges,
+        histogram=grayscale_histogram(filtered),
+    )
+
+
+class ReferenceFeatureCache:
+    """Thread-safe LRU cache of ReferenceFeatures bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, ReferenceFeatures]" = OrderedDict()
+        self._parameters: dict[str, tuple[float, tuple]] = {}
+        self._smoothing_modes: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def parameters(self, reference_image_name: str) -> tuple:
+        """
+        Filter parameters of a reference, re-read from disk only when the
+        parameter file has changed.
+        """
+        mtime = _mtime(parameters_file_path(reference_image_name))
+        with self._lock:
+            cached = self._parameters.get(reference_image_name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        params = read_last_reference_image_parameters(reference_image_name)
+        with self._lock:
+            self._parameters[reference_image_name] = (mtime, params)
+        return params
+
+    def smoothing_mode(self, reference_image_name: str) -> str:
+        """
+        Smoothing mode saved for a reference (bilateral when none is saved),
+        re-read from disk only when the mode file has changed.
+        """
+        mtime = _mtime(reference_image_smoothing_mode_path(reference_image_name))
+        with self._lock:
+            cached = self._smoothing_modes.get(reference_image_name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        mode = SMOOTHING_BILATERAL
+        if mtime:
+            mode = read_reference_image_smoothing_mode(reference_image_name) or mode
+        with self._lock:
+            self._smoothing_modes[reference_image_name] = (mtime, mode)
+        return mode
+
+    def get(
+        self,
+        reference_image_name: str,
+        reference_image,
+        roi: Optional[tuple],
+        params: tuple,
+        smoothing_mode: str = SMOOTHING_BILATERAL,
+    ) -> ReferenceFeatures:
+        """
+        Return the features of a reference crop, building them on a miss.
+        Without an ROI the crop cannot be identified, so nothing is cached.
+        """
+        if roi is None:
+            return build_reference_features(reference_image, params, smoothing_mode)
+
+        key = (
+            reference_image_name,
+            tuple(roi),
+            tuple(params),
+            smoothing_mode,
+            reference_source_mtime(reference_image_name),
+        )
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return features
+            self.misses += 1
+
+        features = build_reference_features(reference_image, params, smoothing_mode)
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            self._trim()
+        return features
+
+    def _trim(self):
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.nbytes
+
+    def invalidate(self, reference_image_name: Optional[str] = None):
+        """Drop the entries of one reference, or of every reference."""
+        with self._lock:
+            if reference_image_name is None:
+                self._entries.clear()
+                self._parameters.clear()
+                self._smoothing_modes.clear()
+                return
+            for key in [k for k in self._entries if k[0] == reference_image_name]:
+                del self._entries[key]
+            self._parameters.pop(reference_image_name, None)
+            self._smoothing_modes.pop(reference_image_name, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+reference_cache = ReferenceFeatureCache()
+
+
+def get_reference_features(
+    reference_image_name: str, reference_image, roi: Optional[tuple] = None
+) -> ReferenceFeatures:
+    return reference_cache.get(
+        reference_image_name,
+        reference_image,
+        roi,
+        reference_cache.parameters(reference_image_name),
+        reference_cache.smoothing_mode(reference_image_name),
+    )
+
+
+def invalidate_reference(reference_image_name: Optional[str] = None):
+    reference_cache.invalidate(reference_image_name)
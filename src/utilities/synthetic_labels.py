@@ -0,0 +1,148 @@
+"""
+Synthetic product labels for benchmarks and parameter tuning.
+
+Labels are drawn with OpenCV from a seed: a colored background, a framed
+logo text and a few bars. A good product is the same label with small
+lighting, noise and position changes; a defective one carries one of the
+DEFECTS drawn on it. Frames place several labels on a conveyor-like
+background together with their (x1, y1, x2, y2) areas.
+"""
+
+import cv2 as cv
+import numpy as np
+
+DEFECTS = ("smudge", "missing_text", "scratch", "color_shift", "misprint")
+
+_TEXTS = ("BRAND", "COFFEE", "LOGO", "MARKA", "CAFE")
+
+
+def synthetic_label(
+    width: int, height: int, seed: int = 0, text: str = None
+) -> np.ndarray:
+    """RGB label image of the given size, identical for identical seeds."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(120, 240, 3)
+    label = np.empty((height, width, 3), dtype=np.uint8)
+    label[:] = background
+
+    ink = tuple(int(v) for v in rng.integers(0, 90, 3))
+    accent = tuple(int(v) for v in rng.integers(0, 255, 3))
+    border = max(2, min(width, height) // 20)
+    cv.rectangle(label, (border, border), (width - border, height - border), ink, 2)
+
+    text = text or _TEXTS[seed % len(_TEXTS)]
+    font_scale = max(0.3, width / (30.0 * len(text)))
+    thickness = max(1, int(font_scale * 2))
+    (text_width, text_height), _ = cv.getTextSize(
+        text, cv.FONT_HERSHEY_SIMPLEX, font_scale, thickness
+    )
+    origin = ((width - text_width) // 2, (height + text_height) // 2)
+    cv.putText(
+        label,
+        text,
+        origin,
+        cv.FONT_HERSHEY_SIMPLEX,
+        font_scale,
+        ink,
+        thickness,
+        cv.LINE_AA,
+    )
+
+    for _ in range(3):
+        y = int(rng.integers(height * 3 // 4, height - border - 2))
+        x1 = int(rng.integers(border * 2, width // 2))
+        x2 = int(rng.integers(width // 2, width - border * 2))
+        cv.line(label, (x1, y), (x2, y), accent, max(1, height // 60))
+    return label
+
+
+def perturb(label: np.ndarray, seed: int = 0, strength: float = 1.0) -> np.ndarray:
+    """A good product: the label with lighting, noise and a shift of ~1 px."""
+    rng = np.random.default_rng(seed)
+    gain = 1.0 + rng.uniform(-0.05, 0.05) * strength
+    offset = rng.uniform(-6, 6) * strength
+    noisy = label.astype(np.float32) * gain + offset
+    noisy += rng.normal(0, 3 * strength, label.shape)
+    shifted = np.clip(noisy, 0, 255).astype(np.uint8)
+    dx, dy = (int(v) for v in rng.integers(-1, 2, 2))
+    matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv.warpAffine(
+        shifted,
+        matrix,
+        (label.shape[1], label.shape[0]),
+        borderMode=cv.BORDER_REPLICATE,
+    )
+
+
+def with_defect(label: np.ndarray, defect: str, seed: int = 0) -> np.ndarray:
+    """A defective product: the label with one of DEFECTS drawn on it."""
+    rng = np.random.default_rng(seed)
+    height, width = label.shape[:2]
+    defective = label.copy()
+    if defect == "smudge":
+        center = (int(rng.integers(width // 4, width * 3 // 4)), height // 2)
+        axes = (max(2, width // 8), max(2, height // 6))
+        color = tuple(int(v) for v in rng.integers(0, 80, 3))
+        cv.ellipse(defective, center, axes, 0, 0, 360, color, -1)
+    elif defect == "missing_text":
+        background = tuple(int(v) for v in label[2, width // 2])
+        cv.rectangle(
+            defective,
+            (width // 4, height // 3),
+            (width * 3 // 4, height * 2 // 3),
+            background,
+            -1,
+        )
+    elif defect == "scratch":
+        cv.line(
+            defective,
+            (0, int(rng.integers(0, height))),
+            (width - 1, int(rng.integers(0, height))),
+            (255, 255, 255),
+            max(2, height // 40),
+        )
+    elif defect == "color_shift":
+        hsv = cv.cvtColor(label, cv.COLOR_RGB2HSV)
+        hsv[..., 0] = (hsv[..., 0].astype(np.int16) + 40) % 180
+        defective = cv.cvtColor(hsv, cv.COLOR_HSV2RGB)
+    elif defect == "misprint":
+        matrix = cv.getRotationMatrix2D((width / 2, height / 2), 8, 1.0)
+        defective = cv.warpAffine(
+            label, matrix, (width, height), borderMode=cv.BORDER_REPLICATE
+        )
+    else:
+        raise ValueError(f"Unknown synthetic defect: {defect}")
+    return defective
+
+
+def synthetic_frame(
+    roi_size: tuple[int, int],
+    roi_count: int,
+    frame_size: tuple[int, int] = (800, 600),
+    seed: int = 0,
+) -> tuple[np.ndarray, list[tuple[int, int, int, int]]]:
+    """
+    An RGB frame of frame_size (width, height) with roi_count labels of
+    roi_size laid out on a grid, and the (x1, y1, x2, y2) area of each label.
+    """
+    frame_width, frame_height = frame_size
+    roi_width, roi_height = roi_size
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(30, 60, (frame_height, frame_width, 3), dtype=np.uint8)
+    frame = cv.GaussianBlur(frame, (5, 5), 0)
+
+    columns = max(1, frame_width // (roi_width + 10))
+    rois = []
+    for index in range(roi_count):
+        row, column = divmod(index, columns)
+        x1 = 5 + column * (roi_width + 10)
+        y1 = 5 + row * (roi_height + 10)
+        x2, y2 = x1 + roi_width, y1 + roi_height
+        if x2 > frame_width or y2 > frame_height:
+            raise ValueError(
+                f"{roi_count} labels of {roi_width}x{roi_height} do not fit "
+                f"in a {frame_width}x{frame_height} frame"
+            )
+        frame[y1:y2, x1:x2] = synthetic_label(roi_width, roi_height, seed + index)
+        rois.append((x1, y1, x2, y2))
+    return frame, rois
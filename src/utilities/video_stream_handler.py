@@ -1,79 +1,319 @@
+"""
+Frame acquisition on a background grab thread.
+
+VideoStreamHandler runs a grab thread that keeps the latest frames of a
+frame source (frame_sources: a Basler camera by default, or a video file,
+an image directory or synthetic labels) in a ring buffer; get_frame and
+snapshot only read from it.
+
+A failing grab is retried after a pause that doubles up to GRAB_RETRY_MAX,
+and a failure streak is logged at most every GRAB_LOG_INTERVAL seconds.
+After GRAB_MAX_FAILURES failures in a row the source is closed and opened
+again; when that did not help GRAB_MAX_REOPENS times, the grab thread stops
+and running turns False.
+"""
+
+import threading
 import time
+from collections import deque
+from typing import Optional
 
 from PIL import Image
-from pypylon import pylon
+
+from src.config import logger
+from src.utilities.frame_sources import (CAMERA_ROI, Frame, FrameSource,
+                                         PylonFrameSource)
+from src.utilities.instrumentation import timed
+
+SNAPSHOT_TIMEOUT = 5.0
+GRAB_RETRY_MIN = 0.01
+GRAB_RETRY_MAX = 1.0
+GRAB_LOG_INTERVAL = 5.0
+GRAB_MAX_FAILURES = 10
+GRAB_MAX_REOPENS = 3
+
+
+class FrameBuffer:
+    """
+    Ring buffer of the latest frames. Readers never block the grab thread;
+    they get the newest frame or wait for the first frame after a timestamp.
+    """
+
+    def __init__(self, size: int = 4):
+        self._frames: deque[Frame] = deque(maxlen=size)
+        self._condition = threading.Condition()
+        self._last_read = -1
+        self.overwritten = 0
+
+    def put(self, frame: Frame):
+        with self._condition:
+            if (
+                len(self._frames) == self._frames.maxlen
+                and self._frames[0].frame_number > self._last_read
+            ):
+                # Hiç okunmamış en eski kare üzerine yazılıyor
+                self.overwritten += 1
+            self._frames.append(frame)
+            self._condition.notify_all()
+
+    def latest(self) -> Optional[Frame]:
+        with self._condition:
+            if not self._frames:
+                return None
+            frame = self._frames[-1]
+            self._last_read = frame.frame_number
+            return frame
+
+    def first_after(self, timestamp: float, timeout: float) -> Optional[Frame]:
+        """
+        First frame whose exposure started after timestamp, waiting up to
+        timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                for frame in self._frames:
+                    if frame.timestamp > timestamp:
+                        self._last_read = max(self._last_read, frame.frame_number)
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def wait_for_new(
+        self, frame_number: Optional[int], timeout: float
+    ) -> Optional[Frame]:
+        """Newest frame unless it is frame_number, waiting up to timeout."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._frames and self._frames[-1].frame_number != frame_number,
+                timeout,
+            )
+        frame = self.latest()
+        if frame is None or frame.frame_number == frame_number:
+            return None
+        return frame
+
+    def wait_for_any(self, timeout: float) -> Optional[Frame]:
+        with self._condition:
+            self._condition.wait_for(lambda: bool(self._frames), timeout)
+        return self.latest()
 
 
 class VideoStreamHandler:
-    def __init__(self, width: int = 1920, height: int = 1080):
+    """
+    Owns a grab thread that keeps the latest frames of a frame source in a
+    ring buffer; get_frame and snapshot only read from it. Without a source
+    the first Basler camera is used.
+    """
+
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        buffer_size: int = 4,
+        camera_roi: bool = CAMERA_ROI,
+        mono: bool = False,
+        source: Optional[FrameSource] = None,
+    ):
         self.width = width
         self.height = height
-        self.camera = None
-        self._initialize_video_capture()
-        self.start_row = int((height - 600) / 2)
-        self.start_col = int((width - 800) / 2)
-        self.end_row = self.start_row + 600
-        self.end_col = self.start_col + 800
-        self.converter = pylon.ImageFormatConverter()
+        self.source = source or PylonFrameSource(
+            width, height, camera_roi=camera_roi, mono=mono
+        )
 
-        # converting to opencv bgr format
-        self.converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        self.converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        self.buffer = FrameBuffer(buffer_size)
+        self.grabbed = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._stop = threading.Event()
+        self._grab_thread = None
+        self._initialize_video_capture()
 
     def _initialize_video_capture(self):
-        # connecting to the first available camera
-        self.camera = pylon.InstantCamera(
-            pylon.TlFactory.GetInstance().CreateFirstDevice()
+        self._start_grabbing()
+        logger.info(msg=f"Frame source initialized: {self.source.describe()}")
+
+    def _start_grabbing(self):
+        self.source.open()
+        self._stop.clear()
+        self._grab_thread = threading.Thread(
+            target=self._grab_loop, name="camera-grab", daemon=True
         )
+        self._grab_thread.start()
 
-        # Grabing Continuously (video) with minimal delay
-        self.camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
-        time.sleep(0.5)
-        print(f"Camera Initialized")
+    def _stop_grabbing(self):
+        self._stop.set()
+        if self._grab_thread is not None:
+            self._grab_thread.join(timeout=2.0)
+            self._grab_thread = None
+        self.source.close()
 
-    def get_frame(self):
-        if not self.camera or not self.camera.IsGrabbing():
-            raise ValueError(
-                "Cannot get frame because video capture is not initialized or opened"
-            )
+    @property
+    def running(self) -> bool:
+        """Whether the grab thread still runs (playback may be exhausted)."""
+        return self._grab_thread is not None and self._grab_thread.is_alive()
 
-        grabResult = self.camera.RetrieveResult(
-            5000, pylon.TimeoutHandling_ThrowException
-        )
-        if grabResult.GrabSucceeded():
-            # Access the image data
-            image = self.converter.Convert(grabResult)
-            frame = image.GetArray()
-            grabResult.Release()
-            return (
-                True,
-                frame[self.start_row : self.end_row, self.start_col : self.end_col],
-            )
-        return False, None
+    @property
+    def camera_roi(self) -> bool:
+        return getattr(self.source, "camera_roi", False)
+
+    @property
+    def mono(self) -> bool:
+        return self.source.mono
 
-    def snapshot(self, filename: str):
-        if not (self.camera and self.camera.IsGrabbing()):
+    def set_acquisition(self, camera_roi: bool = None, mono: bool = None):
+        """
+        Change the camera-side window or the pixel format. Grabbing is stopped
+        and restarted only when a setting actually changes.
+        """
+        camera_roi = self.camera_roi if camera_roi is None else camera_roi
+        mono = self.mono if mono is None else mono
+        if (camera_roi, mono) == (self.camera_roi, self.mono):
+            return
+        self._stop_grabbing()
+        self.source.configure(camera_roi=camera_roi, mono=mono)
+        self._start_grabbing()
+
+    def _grab_loop(self):
+        failures = 0
+        reopens = 0
+        logged_at = None
+        while not self._stop.is_set() and self.source.is_open:
+            try:
+                frame = self.source.grab()
+            except Exception as err:
+                self.failed += 1
+                failures += 1
+                now = time.monotonic()
+                if logged_at is None or now - logged_at >= GRAB_LOG_INTERVAL:
+                    logger.error(msg=f"Frame grab failed ({failures} in a row): {err}")
+                    logged_at = now
+                if failures >= GRAB_MAX_FAILURES:
+                    if reopens >= GRAB_MAX_REOPENS:
+                        logger.error(
+                            msg=f"Frame grab keeps failing after {reopens} reopens, "
+                            "grabbing stopped"
+                        )
+                        break
+                    reopens += 1
+                    failures = 0
+                    self._reopen_source()
+                    continue
+                # Kalıcı hatada döngü dönmez: bekleme her hatada iki katına çıkar
+                self._stop.wait(
+                    min(GRAB_RETRY_MAX, GRAB_RETRY_MIN * 2 ** (failures - 1))
+                )
+                continue
+            if failures or reopens:
+                logger.info(msg="Frame grab recovered")
+                failures = 0
+                reopens = 0
+                logged_at = None
+            if frame is None:
+                if self.source.exhausted:
+                    logger.info(msg="Frame source exhausted")
+                    break
+                continue
+            self._store(frame)
+
+    def _reopen_source(self):
+        logger.warning(msg=f"Reopening frame source: {self.source.describe()}")
+        try:
+            self.source.close()
+            self.source.open()
+        except Exception as err:
+            logger.error(msg=f"Reopening frame source failed: {err}")
+            self._stop.wait(GRAB_RETRY_MAX)
+
+    def _store(self, frame: Frame):
+        frame.latency = time.monotonic() - frame.timestamp
+        self.grabbed += 1
+        self.latency_total += frame.latency
+        self.latency_max = max(self.latency_max, frame.latency)
+        self.buffer.put(frame)
+
+    def _check_running(self, action: str):
+        if self._grab_thread is None or not self.source.is_open:
             raise ValueError(
-                "Cannot take snapshot because video capture is not initialized or opened"
+                f"Cannot {action} because video capture is not initialized or opened"
             )
 
-        grabResult = self.camera.RetrieveResult(
-            5000, pylon.TimeoutHandling_ThrowException
-        )
-        if grabResult.GrabSucceeded():
-            image = self.converter.Convert(grabResult)
-            frame = image.GetArray()
-            cropped_frame = frame[
-                self.start_row : self.end_row, self.start_col : self.end_col
-            ]
-            img = Image.fromarray(cropped_frame)
-            img.save(filename, quality=95)
-            grabResult.Release()
-        else:
+    def latest_frame(self) -> Optional[Frame]:
+        """Newest frame of the ring buffer, None before the first grab."""
+        return self.buffer.latest()
+
+    def get_frame(self):
+        """Non-blocking read of the newest frame as (ok, BGR or gray array)."""
+        self._check_running("get frame")
+        frame = self.buffer.latest()
+        if frame is None:
+            return False, None
+        return True, frame.image
+
+    def capture(
+        self,
+        timings: dict = None,
+        after: Optional[float] = None,
+        timeout: float = SNAPSHOT_TIMEOUT,
+    ) -> Frame:
+        """
+        The newest frame, or with after (a time.monotonic() value) the first
+        frame exposed after it, without touching the disk. With a timings dict
+        the wait is timed as "capture" (ms).
+        """
+        self._check_running("take snapshot")
+
+        with timed(timings, "capture"):
+            if after is not None:
+                frame = self.buffer.first_after(after, timeout)
+            else:
+                frame = self.buffer.latest() or self.buffer.wait_for_any(timeout)
+        if frame is None:
             raise ValueError("Failed to read frame for snapshot")
+        return frame
+
+    def snapshot(
+        self,
+        filename: str,
+        timings: dict = None,
+        after: Optional[float] = None,
+        timeout: float = SNAPSHOT_TIMEOUT,
+    ) -> Frame:
+        """
+        Capture a frame like capture() and save it to filename; the encoding
+        is timed as "encode" (ms).
+        """
+        frame = self.capture(timings, after, timeout)
+        with timed(timings, "encode"):
+            img = Image.fromarray(frame.image)
+            img.save(filename, quality=95)
+        return frame
+
+    def stats(self) -> dict:
+        """
+        Grab counters. Dropped frames are those skipped by the source plus
+        those overwritten in the ring buffer before anyone read them;
+        latencies run from the start of the exposure to the buffer, in ms.
+        """
+        return {
+            "grabbed": self.grabbed,
+            "failed": self.failed,
+            "skipped": self.source.skipped,
+            "overwritten": self.buffer.overwritten,
+            "dropped": self.source.skipped + self.buffer.overwritten,
+            "latency_mean_ms": (
+                self.latency_total / self.grabbed * 1000 if self.grabbed else 0.0
+            ),
+            "latency_max_ms": self.latency_max * 1000,
+            **self.source.describe(),
+        }
 
     def release(self):
-        if self.camera and self.camera.IsGrabbing():
-            self.camera.StopGrabbing()
+        if self._grab_thread is not None:
+            self._stop_grabbing()
+            logger.info(msg=f"Camera released: {self.stats()}")
         else:
-            print("No active video capture to release")
+            logger.info(msg="No active video capture to release")